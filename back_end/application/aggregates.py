@@ -0,0 +1,315 @@
+from back_end.application.bitmaps import bitmap_index
+from back_end.application.columnar import columnar_snapshot, grouped
+from back_end.application.engines import get_engine
+from back_end.application.metrics import registry, span
+from back_end.application.pool import read_pool
+from back_end.application.rollups import ROLLUPS, read_all_rollups, rollup_dict
+from back_end.application.snapshot import snapshot
+
+"""
+Generic group-by aggregation over the healthcare dataset.
+
+aggregate() groups by any combination of columns and computes a count, sum
+or average. Group-bys that match a rollup maintained at ingest are answered
+from the healthcare_rollups table. Everything else runs as a GROUP BY in
+DuckDB when it is the configured engine, on the memory-mapped columnar
+export when HEALTHCARE_COLUMNAR_DIR is set, and otherwise as a single
+vectorized pandas groupby over the shared snapshot.
+
+Filtered aggregations (hospital, doctor, insurance provider, admission
+dates) cannot use the rollups, which only hold global counts. Their rows are
+selected with the bitmap indexes in bitmaps.py and grouped on the columnar
+export or the snapshot.
+
+Results are emitted either nested ({"A+": {"Cancer": 10}}) or columnar
+({"Blood_Type": [...], "Medical_Condition": [...], "value": [...]}).
+"""
+
+METRICS = ("count", "sum", "avg")
+FORMATS = ("nested", "columnar")
+
+# Tables imported before "Test Results" was mapped keep the original column name
+COLUMN_ALIASES = {"Test_Results": "Test Results"}
+
+ROLLUP_BY_COLUMNS = {columns: name for name, columns in ROLLUPS.items()}
+
+
+def parse_metric(metric):
+    """
+    Parses "count", "sum:<column>" or "avg:<column>" into a (function, column) pair.
+    """
+    func, _, column = metric.partition(":")
+    func = func.strip().lower()
+    column = column.strip() or None
+    if func not in METRICS:
+        raise ValueError(f"Unsupported metric '{func}', expected one of {', '.join(METRICS)}")
+    if func == "count" and column:
+        raise ValueError("The count metric does not take a column")
+    if func != "count" and not column:
+        raise ValueError(f"The {func} metric needs a column, e.g. '{func}:Billing_Amount'")
+    return func, column
+
+
+def _from_rollup(by, func, column):
+    name = ROLLUP_BY_COLUMNS.get(tuple(by))
+    if name is None or column not in (None, "Billing_Amount"):
+        return None
+
+    nested = rollup_dict(read_pool.connection(), name, func)
+    if nested is None:
+        return None
+
+    if len(by) == 1:
+        return [((key,), value) for key, value in nested.items()]
+    return [((key1, key2), value) for key1, inner in nested.items() for key2, value in inner.items()]
+
+
+def _resolve_column(table, column):
+    columns = table if isinstance(table, list) else table.columns
+    if column in columns:
+        return column
+    alias = COLUMN_ALIASES.get(column)
+    if alias in columns:
+        return alias
+    return None
+
+
+def _from_engine(by, func, column):
+    engine = get_engine()
+    columns = engine.columns()
+    if not columns:
+        return None
+
+    resolved = [_resolve_column(columns, col) for col in by]
+    if None in resolved:
+        return None
+    if column is not None:
+        column = _resolve_column(columns, column)
+        if column is None:
+            return None
+    return engine.group_by(resolved, func, column)
+
+
+def _from_columnar(by, func, column, filters=None):
+    table = columnar_snapshot.get()
+    if table is None or table.rows == 0:
+        return None
+
+    resolved = [_resolve_column(table, col) for col in by]
+    if None in resolved:
+        return None
+    if column is not None:
+        column = _resolve_column(table, column)
+        if column is None:
+            return None
+    mask = bitmap_index(table).mask(filters) if filters else None
+    return grouped(table, resolved, func, column, mask)
+
+
+def _filter_frame(df, columns, filters):
+    # Only the columns the group-by reads are copied for the matching rows
+    if not filters:
+        return df
+    return df.loc[bitmap_index(df).mask(filters), list(dict.fromkeys(columns))]
+
+
+def _from_snapshot(by, func, column, filters=None):
+    import pandas as pd
+
+    df = snapshot.get()
+    if df is None or df.empty:
+        return None
+
+    columns = [_resolve_column(df, col) for col in by]
+    if None in columns:
+        return None
+    if func != "count":
+        resolved = _resolve_column(df, column)
+        if resolved is None:
+            return None
+        columns.append(resolved)
+    df = _filter_frame(df, columns, filters)
+
+    keys = []
+    for col, key_column in zip(by, columns):
+        values = df[key_column]
+        if pd.api.types.is_string_dtype(values.dtype):
+            values = values.str.strip()
+        keys.append(values.rename(col))
+
+    if func == "count":
+        grouped = df.groupby(keys, observed=True).size()
+    else:
+        if not pd.api.types.is_numeric_dtype(df[resolved].dtype):
+            raise ValueError(f"Column '{column}' is not numeric")
+        grouped = df[resolved].groupby(keys, observed=True).agg("mean" if func == "avg" else "sum")
+
+    groups = grouped.index.tolist()
+    if len(by) == 1:
+        groups = [(key,) for key in groups]
+    return list(zip(groups, grouped.tolist()))
+
+
+def _nest(groups):
+    result = {}
+    for key, value in groups:
+        level = result
+        for part in key[:-1]:
+            level = level.setdefault(part, {})
+        level[key[-1]] = value
+    return result
+
+
+def _columnar(by, groups):
+    result = {col: [key[i] for key, _ in groups] for i, col in enumerate(by)}
+    result["value"] = [value for _, value in groups]
+    return result
+
+
+def aggregate(by, metric="count", format="nested", filters=None):
+    """
+    Groups the dataset by the given columns and computes the metric per group.
+
+    :param by: list of column names to group by
+    :param metric: "count", "sum:<column>" or "avg:<column>"
+    :param format: "nested" or "columnar"
+    :param filters: row filters from bitmaps.build_filters(), or None for the whole dataset
+    :return: the aggregated data, or None if there is no data or a column is missing
+    """
+    if not by:
+        raise ValueError("At least one group-by column is required")
+    if format not in FORMATS:
+        raise ValueError(f"Unsupported format '{format}', expected one of {', '.join(FORMATS)}")
+    func, column = parse_metric(metric)
+
+    with span("aggregate"):
+        groups, source = None, None
+        if not filters:
+            groups = _from_rollup(by, func, column)
+            source = "rollup"
+            if groups is None and get_engine().analytical:
+                groups = _from_engine(by, func, column)
+                source = get_engine().name
+        if groups is None and columnar_snapshot.enabled:
+            groups = _from_columnar(by, func, column, filters)
+            source = "columnar"
+        if groups is None:
+            groups = _from_snapshot(by, func, column, filters)
+            source = "snapshot"
+    if groups is None:
+        return None
+    registry.inc("healthcare_aggregates_total", source=source)
+
+    if format == "columnar":
+        return _columnar(by, groups)
+    return _nest(groups)
+
+
+def _count_many_from_rollups(groupings):
+    names = [ROLLUP_BY_COLUMNS.get(tuple(by)) for by in groupings]
+    if None in names:
+        return None
+    rollups = read_all_rollups(read_pool.connection())
+    if rollups is None or any(name not in rollups for name in names):
+        return None
+
+    results = []
+    for by, name in zip(groupings, names):
+        if len(by) == 1:
+            results.append([((key1,), row_count) for key1, _, row_count, _ in rollups[name]])
+        else:
+            results.append([((key1, key2), row_count) for key1, key2, row_count, _ in rollups[name]])
+    return results
+
+
+def _count_many_from(source, groupings, **kwargs):
+    results = []
+    for by in groupings:
+        groups = source(by, "count", None, **kwargs)
+        if groups is None:
+            return None
+        results.append(groups)
+    return results
+
+
+def _count_many_from_snapshot(groupings, filters=None):
+    import pandas as pd
+
+    df = snapshot.get()
+    if df is None or df.empty:
+        return None
+
+    columns = list(dict.fromkeys(col for by in groupings for col in by))
+    resolved_columns = [_resolve_column(df, col) for col in columns]
+    if None in resolved_columns:
+        return None
+    df = _filter_frame(df, resolved_columns, filters)
+
+    keys = []
+    for col, resolved in zip(columns, resolved_columns):
+        values = df[resolved]
+        if pd.api.types.is_string_dtype(values.dtype):
+            values = values.str.strip()
+        keys.append(values.rename(col))
+
+    # One pass over the rows builds the cube of all grouped columns;
+    # each grouping is then a cheap roll-up of the cube
+    cube = df.groupby(keys, dropna=False, observed=True).size()
+    results = []
+    for by in groupings:
+        grouped = cube.groupby(level=list(by), dropna=True, observed=True).sum()
+        groups = grouped.index.tolist()
+        if len(by) == 1:
+            groups = [(key,) for key in groups]
+        results.append(list(zip(groups, grouped.tolist())))
+    return results
+
+
+def data_fingerprint():
+    """
+    Returns a fingerprint of the data aggregates are served from, for an ETag.
+
+    The rollups and the snapshot follow the database, but the columnar export can lag
+    behind it while another process re-exports it. While it does, the export's own
+    fingerprint is part of the result, so stale counts never carry the ETag of new data.
+    Taken before the data is read, so a concurrent change can only make the ETag older.
+    """
+    fingerprint = snapshot.fingerprint()
+    table = columnar_snapshot.current()
+    if table is None or table.fingerprint == fingerprint:
+        return fingerprint
+    return fingerprint, table.fingerprint
+
+
+def count_many(groupings, format="nested", filters=None):
+    """
+    Computes row counts for several group-bys at once, in a single pass over the data.
+
+    :param groupings: list of column lists, e.g. [["Gender"], ["Blood_Type", "Medical_Condition"]]
+    :param filters: row filters from bitmaps.build_filters(), or None for the whole dataset
+    :return: one aggregated result per grouping, or None if there is no data or a column is missing
+    """
+    if format not in FORMATS:
+        raise ValueError(f"Unsupported format '{format}', expected one of {', '.join(FORMATS)}")
+
+    with span("aggregate"):
+        results, source = None, None
+        if not filters:
+            results = _count_many_from_rollups(groupings)
+            source = "rollup"
+            if results is None and get_engine().analytical:
+                results = _count_many_from(_from_engine, groupings)
+                source = get_engine().name
+        if results is None and columnar_snapshot.enabled:
+            results = _count_many_from(_from_columnar, groupings, filters=filters)
+            source = "columnar"
+        if results is None:
+            results = _count_many_from_snapshot(groupings, filters)
+            source = "snapshot"
+    if results is None:
+        return None
+    registry.inc("healthcare_aggregates_total", source=source)
+
+    if format == "columnar":
+        return [_columnar(by, groups) for by, groups in zip(groupings, results)]
+    return [_nest(groups) for groups in results]
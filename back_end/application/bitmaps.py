@@ -0,0 +1,222 @@
+"""
+Bitmap indexes for the filtered dashboard aggregates.
+
+The /health routes accept filters on hospital, doctor, insurance provider
+and admission date. Rollups only hold global counts, and rescanning the
+text columns of the snapshot for every filter combination would cost a
+full pass per request. Instead, the first filtered request on a dataset
+version builds an inverted index per filtered column: one stable argsort of
+the column's codes, so the rows of a value are a contiguous slice.
+
+From that slice the rows of a value become a packed bitmap (one bit per
+row, np.packbits). Bitmaps are cached, so repeated filters cost nothing.
+Several values of one filter are ORed, and different filters are ANDed on
+the packed bytes. The date range is a slice of the argsort of Admission_Day.
+Only the final bitmap is unpacked into the boolean row mask the group-by
+runs on.
+
+The index is tied to the snapshot DataFrame or columnar table it was built
+from. A new dataset version is a new object, which gets a fresh index.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from back_end.application.metrics import span
+
+# Query parameter -> filtered column; several values of one parameter are ORed
+FILTER_COLUMNS = {
+    "hospital": "Hospital",
+    "doctor": "Doctor",
+    "insurance_provider": "Insurance_Provider",
+}
+
+# The from/to date filter is a range of admission day numbers
+DATE_COLUMN = "Admission_Day"
+
+# Packed bitmaps kept per index; each takes rows / 8 bytes
+BITMAP_CACHE_SIZE = 256
+
+
+def build_filters(values=None, start_day=None, end_day=None):
+    """
+    Returns the filters of a request as {column: [values]} plus {DATE_COLUMN: (start_day, end_day)},
+    or None when nothing is filtered.
+
+    :param values: {query parameter: [values]} for the parameters in FILTER_COLUMNS
+    """
+    filters = {}
+    for param, selected in (values or {}).items():
+        selected = [value.strip() for value in selected or [] if value and value.strip()]
+        if selected:
+            filters[FILTER_COLUMNS[param]] = sorted(set(selected))
+    if start_day is not None or end_day is not None:
+        if start_day is not None and end_day is not None and start_day > end_day:
+            raise ValueError("'from' must not be after 'to'")
+        filters[DATE_COLUMN] = (start_day, end_day)
+    return filters or None
+
+
+def filter_key(filters):
+    """
+    Returns a short stable digest of the filters, e.g. for an ETag.
+    """
+    canonical = json.dumps(sorted((filters or {}).items()), default=list)
+    return hashlib.sha1(canonical.encode()).hexdigest()[:20]
+
+
+def _frame_codes(df):
+    import pandas as pd
+
+    def codes(name):
+        values = df[name]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            return values.cat.codes.to_numpy(), list(values.cat.categories)
+        if pd.api.types.is_string_dtype(values.dtype):
+            values = values.str.strip()
+        column_codes, labels = pd.factorize(values)
+        return column_codes, list(labels)
+
+    return codes
+
+
+class BitmapIndex:
+    """
+    Inverted lists and cached packed bitmaps over one dataset version, built per column on first use.
+
+    :param rows: number of rows
+    :param columns: names of the columns that can be filtered
+    :param codes: function returning (codes, labels) of a column; NULLs have code -1
+    :param values: function returning the numeric values of a column
+    """
+
+    def __init__(self, rows, columns, codes, values):
+        self.rows = rows
+        self.columns = set(columns)
+        self._codes = codes
+        self._values = values
+        self._lock = threading.Lock()
+        self._postings = {}
+        self._sorted = {}
+        self._bitmaps = OrderedDict()
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls(len(df), df.columns, _frame_codes(df), lambda name: df[name].to_numpy())
+
+    @classmethod
+    def from_columnar(cls, table):
+        return cls(table.rows, table.columns, table.group_codes, lambda name: table.values[name])
+
+    def _check_column(self, name):
+        if name not in self.columns:
+            raise ValueError(f"Cannot filter on '{name}', the column is missing from the dataset")
+
+    def _column_postings(self, name):
+        # order lists the rows grouped by value; rows of code i are order[bounds[i]:bounds[i + 1]]
+        import numpy as np
+
+        if name not in self._postings:
+            self._check_column(name)
+            codes, labels = self._codes(name)
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(len(labels) + 1))
+            lookup = {label: i for i, label in enumerate(labels)}
+            self._postings[name] = (order, bounds, lookup)
+        return self._postings[name]
+
+    def _column_sorted(self, name):
+        import numpy as np
+
+        if name not in self._sorted:
+            self._check_column(name)
+            values = np.asarray(self._values(name), dtype=np.float64)
+            order = np.argsort(values, kind="stable")
+            self._sorted[name] = (order, values[order])
+        return self._sorted[name]
+
+    def _pack(self, rows):
+        import numpy as np
+
+        bits = np.zeros(self.rows, dtype=bool)
+        bits[rows] = True
+        return np.packbits(bits)
+
+    def _cached(self, key, build):
+        bitmap = self._bitmaps.get(key)
+        if bitmap is None:
+            bitmap = build()
+            self._bitmaps[key] = bitmap
+            if len(self._bitmaps) > BITMAP_CACHE_SIZE:
+                self._bitmaps.popitem(last=False)
+        else:
+            self._bitmaps.move_to_end(key)
+        return bitmap
+
+    def value_bitmap(self, name, value):
+        """
+        Returns the packed bitmap of the rows where column `name` equals `value`.
+        """
+        def build():
+            order, bounds, lookup = self._column_postings(name)
+            code = lookup.get(value)
+            if code is None:
+                return self._pack([])
+            return self._pack(order[bounds[code]:bounds[code + 1]])
+
+        return self._cached((name, value), build)
+
+    def range_bitmap(self, name, low=None, high=None):
+        """
+        Returns the packed bitmap of the rows where low <= column `name` <= high (bounds are optional).
+        """
+        import numpy as np
+
+        def build():
+            order, values = self._column_sorted(name)
+            # NaN sorts last, so an open upper bound stops before the NULLs
+            start = 0 if low is None else np.searchsorted(values, low, side="left")
+            stop = np.searchsorted(values, np.inf if high is None else high, side="right")
+            return self._pack(order[start:stop])
+
+        return self._cached((name, low, high), build)
+
+    def mask(self, filters):
+        """
+        Returns the boolean row mask of the rows matching every filter, or None without filters.
+        """
+        import numpy as np
+
+        if not filters:
+            return None
+        with span("bitmap_filter"), self._lock:
+            packed = None
+            for name, condition in filters.items():
+                if name == DATE_COLUMN:
+                    bitmap = self.range_bitmap(name, *condition)
+                else:
+                    bitmap = np.bitwise_or.reduce([self.value_bitmap(name, value) for value in condition])
+                packed = bitmap if packed is None else packed & bitmap
+            return np.unpackbits(packed, count=self.rows).view(bool)
+
+
+_index = None
+_index_source = None
+_index_lock = threading.Lock()
+
+
+def bitmap_index(source):
+    """
+    Returns the bitmap index of a snapshot DataFrame or columnar table, rebuilt when the source is a new version.
+    """
+    global _index, _index_source
+    with _index_lock:
+        if _index is None or _index_source is not source:
+            if hasattr(source, "group_codes"):
+                _index = BitmapIndex.from_columnar(source)
+            else:
+                _index = BitmapIndex.from_frame(source)
+            _index_source = source
+        return _index
@@ -0,0 +1,251 @@
+"""
+Schema catalog and the compact schema prompt for SQL generation.
+
+get_sql_query() used to send the full schema description with every
+prompt. It never told the model which literal values exist, so the model
+guessed 'cancer' for 'Cancer' or 'Urgent' for 'Emergency'. The query then
+returned nothing, and the user asked again.
+
+Ingest now records a catalog row per column of healthcare_data in
+healthcare_catalog: its type, distinct count and min/max, plus the full
+list of values for low-cardinality columns. schema_prompt() uses it to
+build a smaller schema:
+
+- every column name, as a single list (types are given for the relevant ones);
+- a description only for the columns the question refers to, by keyword
+  or by naming one of their values;
+- the exact values of those columns (or their range, or the value the
+  question names).
+
+Without a catalog (a database imported before it existed) the full
+description is used, as before.
+"""
+
+import json
+import re
+import sqlite3
+import threading
+
+from back_end.application.intents import COLUMN_PHRASES, SYNONYMS, lexicon, tokenize
+from back_end.application.pool import read_pool
+from back_end.application.snapshot import snapshot
+
+TABLE = "healthcare_data"
+
+# Column -> (SQL type, description)
+COLUMN_DESCRIPTIONS = {
+    "ID": ("INTEGER PRIMARY KEY", "Unique patient ID"),
+    "Name": ("TEXT", "Patient's name"),
+    "Age": ("INTEGER", "Patient's age"),
+    "Gender": ("TEXT", "Gender of the patient"),
+    "Blood_Type": ("TEXT", "Blood type of the patient"),
+    "Medical_Condition": ("TEXT", "Diagnosed medical condition"),
+    "Date_of_Admission": ("TEXT", "Date of hospital admission"),
+    "Doctor": ("TEXT", "Attending doctor"),
+    "Hospital": ("TEXT", "Hospital name"),
+    "Insurance_Provider": ("TEXT", "Insurance company"),
+    "Billing_Amount": ("REAL", "Total medical bill"),
+    "Room_Number": ("INTEGER", "Room number"),
+    "Admission_Type": ("TEXT", "Type of admission (Emergency/Elective)"),
+    "Discharge_Date": ("TEXT", "Date of discharge"),
+    "Medication": ("TEXT", "Prescribed medication"),
+    "Test_Results": ("TEXT", "Lab test results"),
+    "Admission_Day": ("INTEGER", "Date of admission as days since 1970-01-01 (indexed)"),
+    "Discharge_Day": ("INTEGER", "Date of discharge as days since 1970-01-01"),
+    "Length_of_Stay": ("INTEGER", "Days between admission and discharge"),
+}
+
+# Words that point at a column besides the phrases the intent matcher knows
+COLUMN_KEYWORDS = {
+    "Name": {"name", "names", "who", "list"},
+    "Age": {"age", "aged", "old", "older", "oldest", "younger", "youngest", "elderly"},
+    "Billing_Amount": {"bill", "bills", "billing", "billed", "amount", "cost", "costs", "charges", "charged",
+                       "paid", "expensive", "revenue", "spent", "spend"},
+    "Date_of_Admission": {"admitted", "admission", "admissions", "date", "dates", "when", "year", "month",
+                          "recent", "latest", "earliest"},
+    "Discharge_Date": {"discharge", "discharged"},
+    "Length_of_Stay": {"stay", "stayed", "stays", "length", "long", "longest", "shortest", "days"},
+    "Room_Number": {"room", "rooms"},
+    "Medication": {"drug", "drugs", "medicine", "medicines", "prescribed", "prescription", "medications",
+                   "taking", "takes", "took"},
+    "Medical_Condition": {"disease", "diseases", "diagnosis", "diagnosed", "illness"},
+    "Insurance_Provider": {"insurer", "insurers", "insured", "coverage", "covered"},
+    "Admission_Type": {"emergency", "elective", "urgent"},
+    "Test_Results": {"abnormal", "normal", "inconclusive"},
+}
+
+YEAR = re.compile(r"\b(?:19|20)\d{2}\b")
+ISO_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}")
+
+# Columns with at most this many distinct values have them stored in the catalog
+MAX_CATALOG_VALUES = 50
+
+# Text columns with at most this many values have them all listed in the prompt;
+# for larger ones only the values the question names are
+MAX_PROMPT_VALUES = 20
+
+CREATE_CATALOG = """
+CREATE TABLE IF NOT EXISTS healthcare_catalog (
+    column_name TEXT PRIMARY KEY,
+    data_type TEXT NOT NULL,
+    distinct_count INTEGER NOT NULL,
+    min_value,
+    max_value,
+    value_list TEXT
+)
+"""
+
+
+def rebuild_catalog(conn):
+    """
+    Recomputes the catalog from healthcare_data: one scan for the counts and ranges,
+    then the values of every low-cardinality column.
+    """
+    conn.execute(CREATE_CATALOG)
+    conn.execute("DELETE FROM healthcare_catalog")
+    columns = [(row[1], row[2] or "") for row in conn.execute(f"PRAGMA table_info({TABLE})")]
+    if not columns:
+        return
+
+    # Quoted, since tables written by to_sql() may have columns like "index"
+    stats = ", ".join(f'COUNT(DISTINCT "{name}"), MIN("{name}"), MAX("{name}")' for name, _ in columns)
+    row = conn.execute(f"SELECT {stats} FROM {TABLE}").fetchone()
+    entries = []
+    for i, (name, data_type) in enumerate(columns):
+        distinct, low, high = row[3 * i:3 * i + 3]
+        values = None
+        if 0 < distinct <= MAX_CATALOG_VALUES:
+            values = [value for (value,) in conn.execute(
+                f'SELECT DISTINCT "{name}" FROM {TABLE} WHERE "{name}" IS NOT NULL ORDER BY "{name}"'
+            )]
+        entries.append((name, data_type, distinct, low, high, None if values is None else json.dumps(values)))
+    conn.executemany("INSERT INTO healthcare_catalog VALUES (?, ?, ?, ?, ?, ?)", entries)
+
+
+def read_catalog(conn):
+    """
+    Returns {column: {"type", "distinct", "min", "max", "values"}} in table order,
+    or None if no catalog has been built.
+    """
+    try:
+        rows = conn.execute(
+            "SELECT column_name, data_type, distinct_count, min_value, max_value, value_list FROM healthcare_catalog"
+        ).fetchall()
+    except sqlite3.OperationalError:
+        # The catalog table has not been created yet
+        return None
+    if not rows:
+        return None
+    return {
+        name: {
+            "type": data_type,
+            "distinct": distinct,
+            "min": low,
+            "max": high,
+            "values": None if values is None else json.loads(values),
+        }
+        for name, data_type, distinct, low, high, values in rows
+    }
+
+
+class SchemaCatalog:
+    """
+    The stored catalog, re-read when the database changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self.columns = None
+
+    def get(self):
+        with self._lock:
+            version = snapshot.fingerprint()
+            if version != self._version:
+                self.columns = read_catalog(read_pool.connection())
+                self._version = version
+            return self.columns
+
+
+schema_catalog = SchemaCatalog()
+
+
+def full_schema():
+    lines = [f"Table: {TABLE}", "Columns:"]
+    lines += [f"- {name} ({data_type}): {text}" for name, (data_type, text) in COLUMN_DESCRIPTIONS.items()]
+    return "\n".join(lines) + "\n"
+
+
+def relevant_columns(prompt, catalog):
+    """
+    Returns {column: [values named in the prompt]} for the catalog columns the prompt refers to.
+    """
+    tokens = tokenize(prompt)
+    text = " " + " ".join(tokens) + " "
+    found = {}
+
+    for phrase, column in COLUMN_PHRASES.items():
+        if f" {phrase} " in text:
+            found.setdefault(column, [])
+    for column, keywords in COLUMN_KEYWORDS.items():
+        if keywords.intersection(tokens):
+            found.setdefault(column, [])
+    if YEAR.search(prompt):
+        found.setdefault("Date_of_Admission", [])
+
+    # Values of the categorical columns, looked up like the intent matcher does
+    lexicon.refresh_if_changed()
+    for size in range(min(lexicon.max_tokens, len(tokens)), 0, -1):
+        for start in range(len(tokens) - size + 1):
+            match = lexicon.lookup(tokens[start:start + size])
+            if match is None and size == 1:
+                match = SYNONYMS.get(tokens[start])
+            if match is not None:
+                column, value = match
+                values = found.setdefault(column, [])
+                if value not in values:
+                    values.append(value)
+
+    return {column: values for column, values in found.items() if column in catalog}
+
+
+def _quote(value):
+    return "'" + str(value).replace("'", "''") + "'" if isinstance(value, str) else str(value)
+
+
+def _column_line(name, entry, named_values):
+    data_type, text = COLUMN_DESCRIPTIONS.get(name, (entry["type"], ""))
+    line = f"- {name} ({data_type})" + (f": {text}" if text else "")
+    values = entry["values"]
+    numeric = entry["type"] in ("INTEGER", "REAL")
+    if values is not None and not numeric and len(values) <= MAX_PROMPT_VALUES:
+        line += f". Values: {', '.join(_quote(value) for value in values)}"
+    elif named_values:
+        line += f". The question means: {', '.join(_quote(value) for value in named_values)}"
+    elif entry["min"] is not None and (numeric or ISO_DATE.match(str(entry["min"]))):
+        line += f". Range: {entry['min']} to {entry['max']}"
+    elif entry["distinct"]:
+        line += f". {entry['distinct']:,} distinct values"
+    return line
+
+
+def schema_prompt(prompt):
+    """
+    Returns the schema description to send with a question: compact when the catalog exists,
+    the full description otherwise.
+    """
+    catalog = schema_catalog.get()
+    if not catalog:
+        return full_schema()
+
+    relevant = relevant_columns(prompt, catalog)
+    if not relevant:
+        # Nothing to narrow down on; describe every column, still without values
+        return full_schema()
+
+    lines = [f"Table: {TABLE}({', '.join(catalog)})", "Columns relevant to the question:"]
+    for name in catalog:
+        if name in relevant:
+            lines.append(_column_line(name, catalog[name], relevant[name]))
+    lines.append("Text values are case-sensitive; use them exactly as listed.")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,32 @@
+"""
+Single-flight request coalescing.
+
+Concurrent callers asking for the same key share one in-flight coroutine
+instead of each starting their own. The first caller starts the work; the
+others await the same task. The key is released as soon as the task
+finishes, so later requests start fresh.
+"""
+
+import asyncio
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight = {}
+
+    def __len__(self):
+        return len(self._inflight)
+
+    async def do(self, key, func):
+        """
+        Runs func() for key unless a call for the same key is already running,
+        in which case its result (or exception) is shared.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # Shielded so one caller disconnecting doesn't cancel the work for the others
+        return await asyncio.shield(task)
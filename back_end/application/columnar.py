@@ -0,0 +1,286 @@
+"""
+Memory-mapped columnar snapshot shared by all worker processes.
+
+With several uvicorn workers, every process used to hold its own pandas
+copy of healthcare_data. When HEALTHCARE_COLUMNAR_DIR is set, the dataset
+is exported once to a directory of NumPy .npy files instead:
+
+    <dir>/CURRENT                     name of the live version directory
+    <dir>/v-<id>/manifest.json        row count, columns, source fingerprint
+    <dir>/v-<id>/<column>.codes.npy   int32 codes of a text column (-1 = NULL)
+    <dir>/v-<id>/<column>.json        sorted categories the codes index into
+    <dir>/v-<id>/<column>.npy         values of a numeric column
+
+Workers open the files with np.load(mmap_mode="r"), so every process
+shares the same page-cache pages. Group-bys run directly on the codes with
+np.bincount (see grouped()).
+
+A new export is written to a fresh version directory, then CURRENT is
+swapped with os.replace(), so readers always see a complete version. When
+the database changes, the first worker to notice re-exports while holding
+a lock file. The others keep serving the previous version until the swap.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+from back_end.application.database import load_table
+from back_end.application.metrics import span
+from back_end.application.pool import DB_PATH, connect
+from back_end.application.snapshot import file_fingerprint
+
+COLUMNAR_DIR = os.getenv("HEALTHCARE_COLUMNAR_DIR", "")
+
+POINTER = "CURRENT"
+LOCK = "export.lock"
+
+# A lock file older than this is left over from a crashed export
+STALE_LOCK_SECONDS = 600
+
+# Versions kept on disk; the previous one may still be mapped by slower workers
+KEEP_VERSIONS = 2
+
+
+def _write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def _column_file(name):
+    return name.replace(os.sep, "_")
+
+
+def export_columnar(db_path=DB_PATH, directory=COLUMNAR_DIR):
+    """
+    Exports healthcare_data to a new version directory and swaps it in. Returns the version name.
+    """
+    import numpy as np
+    import pandas as pd
+
+    # Taken before reading, so writes made during the export trigger another one
+    fingerprint = file_fingerprint(db_path)
+    conn = connect(db_path, readonly=True)
+    try:
+        with span("columnar_export"):
+            df = load_table(conn)
+    finally:
+        conn.close()
+
+    os.makedirs(directory, exist_ok=True)
+    version = f"v-{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+    target = os.path.join(directory, version)
+    os.makedirs(target)
+
+    columns = {}
+    for name in df.columns:
+        values = df[name]
+        filename = _column_file(name)
+        if pd.api.types.is_numeric_dtype(values.dtype):
+            np.save(os.path.join(target, f"{filename}.npy"), values.to_numpy())
+            columns[name] = {"kind": "values", "file": filename}
+        else:
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                categorical = values.cat.remove_unused_categories().array
+            else:
+                categorical = pd.Categorical(values.astype("string").str.strip())
+            np.save(os.path.join(target, f"{filename}.codes.npy"), categorical.codes.astype(np.int32))
+            _write_json(os.path.join(target, f"{filename}.json"), [str(c) for c in categorical.categories])
+            columns[name] = {"kind": "codes", "file": filename}
+
+    manifest = {"rows": len(df), "columns": columns, "fingerprint": fingerprint}
+    _write_json(os.path.join(target, "manifest.json"), manifest)
+
+    # Atomic swap: readers see either the old or the new version, never a partial one
+    pointer_tmp = os.path.join(directory, f"{POINTER}.{uuid.uuid4().hex}")
+    with open(pointer_tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(pointer_tmp, os.path.join(directory, POINTER))
+
+    _prune_versions(directory, version)
+    return version
+
+
+def _prune_versions(directory, current):
+    versions = sorted(name for name in os.listdir(directory) if name.startswith("v-") and name != current)
+    for name in versions[:max(0, len(versions) - (KEEP_VERSIONS - 1))]:
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+class ColumnarTable:
+    """
+    One exported version, with every column memory-mapped read-only.
+    """
+
+    def __init__(self, path):
+        import numpy as np
+
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.path = path
+        self.rows = manifest["rows"]
+        self.fingerprint = tuple(tuple(part) if part else None for part in manifest["fingerprint"])
+        self.codes, self.categories, self.values = {}, {}, {}
+        for name, spec in manifest["columns"].items():
+            filename = os.path.join(path, spec["file"])
+            if spec["kind"] == "codes":
+                self.codes[name] = np.load(f"{filename}.codes.npy", mmap_mode="r")
+                with open(f"{filename}.json", encoding="utf-8") as f:
+                    self.categories[name] = json.load(f)
+            else:
+                self.values[name] = np.load(f"{filename}.npy", mmap_mode="r")
+
+    @property
+    def columns(self):
+        return list(self.codes) + list(self.values)
+
+    def group_codes(self, name):
+        """
+        Returns (codes, labels) for grouping by a column; NULLs get code -1.
+        """
+        import numpy as np
+
+        if name in self.codes:
+            return self.codes[name], self.categories[name]
+        values = self.values[name]
+        valid = ~np.isnan(values) if values.dtype.kind == "f" else np.ones(len(values), dtype=bool)
+        labels, inverse = np.unique(values[valid], return_inverse=True)
+        codes = np.full(len(values), -1, dtype=np.int64)
+        codes[valid] = inverse
+        return codes, labels.tolist()
+
+
+def grouped(table, by, func="count", column=None, mask=None):
+    """
+    Computes a count, sum or average per group of the `by` columns, as [(key tuple, value), ...]
+    sorted by key like a pandas groupby. Only rows selected by the boolean mask are counted.
+    """
+    import numpy as np
+
+    if column is not None and column not in table.values:
+        raise ValueError(f"Column '{column}' is not numeric")
+
+    key = np.zeros(table.rows, dtype=np.int64)
+    valid = np.ones(table.rows, dtype=bool) if mask is None else mask.copy()
+    labels, shape = [], []
+    for name in by:
+        codes, column_labels = table.group_codes(name)
+        valid &= codes >= 0
+        key = key * max(len(column_labels), 1) + codes
+        labels.append(column_labels)
+        shape.append(max(len(column_labels), 1))
+    key = key[valid]
+
+    # Dense bins for the combined key, unless the cross product is much larger than the data
+    groups = None
+    bins = int(np.prod(shape, dtype=np.float64)) if shape else 1
+    if bins > max(4 * len(key), 1024):
+        groups, key = np.unique(key, return_inverse=True)
+        bins = len(groups)
+
+    counts = np.bincount(key, minlength=bins)
+    if func == "count":
+        result = counts
+    else:
+        values = np.asarray(table.values[column][valid], dtype=np.float64)
+        present = ~np.isnan(values)
+        sums = np.bincount(key[present], weights=values[present], minlength=bins)
+        if func == "sum":
+            result = sums
+        else:
+            numbers = np.bincount(key[present], minlength=bins)
+            result = np.divide(sums, numbers, out=np.full(bins, np.nan), where=numbers > 0)
+
+    nonempty = np.flatnonzero(counts)
+    flat = nonempty if groups is None else groups[nonempty]
+    positions = np.unravel_index(flat, shape)
+    keys = zip(*(np.asarray(column_labels, dtype=object)[pos] for column_labels, pos in zip(labels, positions)))
+    out = []
+    for group_key, value in zip(keys, result[nonempty].tolist()):
+        out.append((tuple(group_key), None if value != value else value))
+    return out
+
+
+class ColumnarSnapshot:
+    """
+    The current exported version for this process, re-mapped when CURRENT is swapped.
+    """
+
+    def __init__(self, directory, db_path):
+        self.directory = directory
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._table = None
+        self._version = None
+
+    @property
+    def enabled(self):
+        return bool(self.directory)
+
+    def _read_pointer(self):
+        try:
+            with open(os.path.join(self.directory, POINTER), encoding="utf-8") as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    def _try_export(self):
+        # One process exports at a time; the others keep using the current version
+        lock_path = os.path.join(self.directory, LOCK)
+        os.makedirs(self.directory, exist_ok=True)
+        try:
+            if time.time() - os.path.getmtime(lock_path) > STALE_LOCK_SECONDS:
+                os.remove(lock_path)
+        except OSError:
+            pass
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        try:
+            export_columnar(self.db_path, self.directory)
+        finally:
+            os.close(fd)
+            os.remove(lock_path)
+        return True
+
+    def _map_current(self):
+        version = self._read_pointer()
+        if version is not None and version != self._version:
+            self._table = ColumnarTable(os.path.join(self.directory, version))
+            self._version = version
+
+    def current(self):
+        """
+        Returns the mapped table of the latest export without exporting a new one, or None.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._map_current()
+            return self._table
+
+    def get(self, force_export=False):
+        """
+        Returns the mapped table, exporting a new version first if the database changed.
+        Returns None when no export exists yet and another process is writing one.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._map_current()
+
+            stale = self._table is None or self._table.fingerprint != file_fingerprint(self.db_path)
+            if (stale or force_export) and os.path.exists(self.db_path) and self._try_export():
+                self._version = self._read_pointer()
+                self._table = ColumnarTable(os.path.join(self.directory, self._version))
+            return self._table
+
+    def refresh(self):
+        return self.get(force_export=True)
+
+
+columnar_snapshot = ColumnarSnapshot(COLUMNAR_DIR, DB_PATH)
@@ -1,16 +1,24 @@
-
+import argparse
+import os
+import sys
 import sqlite3
 import pandas as pd
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from back_end.application.catalog import rebuild_catalog
+from back_end.application.columnar import COLUMNAR_DIR, export_columnar
+from back_end.application.engines import ENGINE, PARQUET_PATH, export_parquet
+from back_end.application.dictionary import DICTIONARY_COLUMNS, is_empty, rebuild_dictionary, reset_dictionary, update_dictionary
+from back_end.application.indexes import create_default_indexes
+from back_end.application.pool import DB_PATH, connect
+from back_end.application.rollups import rebuild_rollups, reset_rollups, update_rollups
+
 # Define file paths
-DB_PATH = r"E:\Healthcare_chat_AI\data\veludb.db"
 file_path = r"E:\Healthcare_chat_AI\data\healthcare_dataset.csv"
 
-# Load CSV into a Pandas DataFrame
-df = pd.read_csv(file_path)
-
-# Print original column names to debug potential issues
-print("Original CSV Columns:", df.columns.tolist())
+# Rows read, cleaned and inserted per transaction
+CHUNK_SIZE = 50000
 
 # Define column name mapping
 column_mapping = {
@@ -22,34 +30,51 @@ column_mapping = {
     "Room Number": "Room_Number",
     "Admission Type": "Admission_Type",
     "Discharge Date": "Discharge_Date",
+    "Test Results": "Test_Results",
 }
 
-# Rename columns only if they exist in the CSV
-df.rename(columns=column_mapping, inplace=True)
+# Columns of healthcare_data filled from the CSV (ID is assigned by SQLite)
+COLUMNS = [
+    "Name",
+    "Age",
+    "Gender",
+    "Blood_Type",
+    "Medical_Condition",
+    "Date_of_Admission",
+    "Doctor",
+    "Hospital",
+    "Insurance_Provider",
+    "Billing_Amount",
+    "Room_Number",
+    "Admission_Type",
+    "Discharge_Date",
+    "Medication",
+    "Test_Results",
+    "Admission_Day",
+    "Discharge_Day",
+    "Length_of_Stay",
+]
 
-# Print updated column names to confirm the change
-print("Updated Columns:", df.columns.tolist())
+# Columns of tables written by the original to_sql() import, renamed on migration
+LEGACY_COLUMNS = {"Test Results": "Test_Results"}
 
-# Ensure all necessary columns exist
-for col in column_mapping.values():
-    if col not in df.columns:
-        print(f"Error: Column '{col}' is missing after renaming! Check CSV headers.")
+# Integer columns derived from the dates: days since 1970-01-01 and the stay in days.
+# Tables created before they existed are migrated with these SQL expressions
+# (in order: Length_of_Stay is computed from the day numbers).
+DERIVED_COLUMNS = {
+    "Admission_Day": "CAST(julianday(Date_of_Admission) - 2440587.5 AS INTEGER)",
+    "Discharge_Day": "CAST(julianday(Discharge_Date) - 2440587.5 AS INTEGER)",
+    "Length_of_Stay": "Discharge_Day - Admission_Day",
+}
 
-# Clean the data
-df["Age"] = pd.to_numeric(df["Age"], errors="coerce").fillna(0).astype("Int64")
-df["Billing_Amount"] = pd.to_numeric(df["Billing_Amount"], errors="coerce").fillna(0.0)
+UNIX_EPOCH = pd.Timestamp("1970-01-01")
 
-# Convert date columns if they exist
-for col in ["Date_of_Admission", "Discharge_Date"]:
-    if col in df.columns:
-        df[col] = pd.to_datetime(df[col], errors="coerce").dt.strftime("%Y-%m-%d")
+# Columns identifying a patient stay when upserting
+UPSERT_KEY = ["Name", "Date_of_Admission", "Doctor", "Hospital"]
 
-# Connect to SQLite database
-conn = sqlite3.connect("veludb.db")
-cursor = conn.cursor()
+MODES = ("append", "upsert", "replace")
 
-# Create table with correct column names
-cursor.execute("""
+CREATE_TABLE = """
 CREATE TABLE IF NOT EXISTS healthcare_data (
     ID INTEGER PRIMARY KEY AUTOINCREMENT,
     Name TEXT,
@@ -62,18 +87,241 @@ CREATE TABLE IF NOT EXISTS healthcare_data (
     Hospital TEXT,
     Insurance_Provider TEXT,
     Billing_Amount REAL,
+    Room_Number INTEGER,
     Admission_Type TEXT,
     Discharge_Date TEXT,
     Medication TEXT,
-    Test_Results TEXT
+    Test_Results TEXT,
+    Admission_Day INTEGER,
+    Discharge_Day INTEGER,
+    Length_of_Stay INTEGER
 )
-""")
+"""
+
+INSERT_ROW = f"""
+INSERT INTO healthcare_data ({", ".join(COLUMNS)})
+VALUES ({", ".join("?" for _ in COLUMNS)})
+"""
+
+UPSERT_ROW = INSERT_ROW + f"""
+ON CONFLICT ({", ".join(UPSERT_KEY)}) DO UPDATE SET
+    {", ".join(f"{col} = excluded.{col}" for col in COLUMNS if col not in UPSERT_KEY)}
+"""
+
+
+def clean_chunk(df):
+    """
+    Applies the column mapping and the number/date cleaning rules to a chunk of the CSV.
+    """
+    # Rename columns only if they exist in the CSV
+    df = df.rename(columns=column_mapping)
+
+    # Columns missing from the CSV are inserted as NULL
+    for col in COLUMNS:
+        if col not in df.columns:
+            df[col] = None
+
+    # Clean the data
+    df["Age"] = pd.to_numeric(df["Age"], errors="coerce").fillna(0).astype("Int64")
+    df["Billing_Amount"] = pd.to_numeric(df["Billing_Amount"], errors="coerce").fillna(0.0)
+    df["Room_Number"] = pd.to_numeric(df["Room_Number"], errors="coerce").astype("Int64")
+
+    # Dictionary-encoded columns are stored trimmed, so each value has one code
+    for col in DICTIONARY_COLUMNS:
+        df[col] = df[col].astype("string").str.strip()
+
+    # Convert date columns, keeping the text form for SQL and day numbers for range queries
+    for col, day_col in [("Date_of_Admission", "Admission_Day"), ("Discharge_Date", "Discharge_Day")]:
+        dates = pd.to_datetime(df[col], errors="coerce")
+        df[col] = dates.dt.strftime("%Y-%m-%d")
+        df[day_col] = ((dates - UNIX_EPOCH) // pd.Timedelta(days=1)).astype("Int64")
+    df["Length_of_Stay"] = df["Discharge_Day"] - df["Admission_Day"]
+
+    return df[COLUMNS]
+
+
+def _migrate(conn):
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(healthcare_data)")}
+    changes = []
+    for old, new in LEGACY_COLUMNS.items():
+        if old in existing and new not in existing:
+            conn.execute(f'ALTER TABLE healthcare_data RENAME COLUMN "{old}" TO {new}')
+            existing = (existing - {old}) | {new}
+            changes.append(f"renamed '{old}' to {new}")
+
+    for col in DERIVED_COLUMNS:
+        if col not in existing:
+            conn.execute(f"ALTER TABLE healthcare_data ADD COLUMN {col} INTEGER")
+            changes.append(f"added {col}")
+
+    # Every derived column is backfilled, so an interrupted migration is completed by the next one
+    backfilled = 0
+    for col, expression in DERIVED_COLUMNS.items():
+        backfilled += conn.execute(
+            f"UPDATE healthcare_data SET {col} = {expression} WHERE {col} IS NULL AND ({expression}) IS NOT NULL"
+        ).rowcount
+    if backfilled:
+        changes.append(f"backfilled {backfilled} values")
+
+    if changes:
+        if any(change.startswith("renamed") for change in changes):
+            rebuild_dictionary(conn)
+        rebuild_rollups(conn)
+    return changes
+
+
+def migrate_schema(conn):
+    """
+    Brings a table created by an earlier version up to the current schema: renames legacy
+    columns, adds the derived day columns and backfills them. Returns the changes made.
+
+    Runs in one transaction (or in the caller's, if one is open), so a failure leaves
+    the table as it was.
+    """
+    if conn.in_transaction:
+        return _migrate(conn)
+    conn.execute("BEGIN")
+    try:
+        changes = _migrate(conn)
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+    return changes
+
+
+def ensure_schema(conn, mode):
+    """
+    Creates healthcare_data with the declared schema (dropping it first in replace mode).
+    """
+    if mode == "replace":
+        conn.execute("DROP TABLE IF EXISTS healthcare_data")
+        reset_rollups(conn)
+        reset_dictionary(conn)
+
+    conn.execute(CREATE_TABLE)
+    migrate_schema(conn)
+
+    # Tables imported before the dictionary existed get theirs built from the data
+    if is_empty(conn) and conn.execute("SELECT 1 FROM healthcare_data LIMIT 1").fetchone():
+        rebuild_dictionary(conn)
+
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(healthcare_data)")}
+    missing = [col for col in COLUMNS if col not in existing]
+    if missing:
+        raise ValueError(
+            f"healthcare_data does not match the declared schema (missing {', '.join(missing)}); "
+            "re-import it with --mode replace"
+        )
+
+    if mode == "upsert":
+        try:
+            conn.execute(
+                f"CREATE UNIQUE INDEX IF NOT EXISTS idx_healthcare_data_stay ON healthcare_data ({', '.join(UPSERT_KEY)})"
+            )
+        except sqlite3.IntegrityError:
+            raise ValueError(
+                f"healthcare_data holds duplicate stays ({', '.join(UPSERT_KEY)}), so it cannot be upserted into; "
+                "re-import it with --mode replace"
+            )
+    conn.commit()
+
+
+def chunk_rows(df):
+    """
+    Converts a cleaned chunk into tuples of native Python values for executemany.
+    """
+    df = df.astype(object).where(df.notna(), None)
+    return zip(*(df[col].tolist() for col in COLUMNS))
+
+
+def ingest_csv(csv_path, db_path=DB_PATH, mode="append", chunksize=CHUNK_SIZE, columnar_dir=COLUMNAR_DIR,
+               parquet_path=None):
+    """
+    Streams a CSV into healthcare_data chunk by chunk and returns the number of rows read.
+
+    :param mode: "append" adds the rows, "upsert" updates stays already present
+                 (matched on UPSERT_KEY) and "replace" recreates the table first
+    :param columnar_dir: if set, the table is then exported to this columnar snapshot directory
+    :param parquet_path: if set, the table is then written to this Parquet file for the DuckDB engine;
+                         defaults to PARQUET_PATH when HEALTHCARE_ENGINE=duckdb
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unsupported mode '{mode}', expected one of {', '.join(MODES)}")
+
+    conn = connect(db_path)
+    try:
+        ensure_schema(conn, mode)
+        statement = UPSERT_ROW if mode == "upsert" else INSERT_ROW
+
+        total = 0
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+            if total == 0:
+                missing = [col for col in column_mapping if col not in chunk.columns]
+                if missing:
+                    print(f"Error: Columns {missing} are missing from the CSV! Check CSV headers.")
+
+            chunk = clean_chunk(chunk)
+
+            # One transaction per chunk keeps memory flat and commits in bulk
+            with conn:
+                conn.executemany(statement, chunk_rows(chunk))
+                update_dictionary(conn, chunk)
+                if mode != "upsert":
+                    update_rollups(conn, chunk)
+
+            total += len(chunk)
+            print(f"Imported {total} rows...")
+
+        # Upserted rows may replace existing ones, so their counts cannot just be added
+        if mode == "upsert":
+            with conn:
+                rebuild_rollups(conn)
+
+        # Built after the bulk load so the inserts don't maintain them row by row
+        with conn:
+            create_default_indexes(conn)
+            rebuild_catalog(conn)
+    finally:
+        conn.close()
+
+    if columnar_dir:
+        export_columnar(db_path, columnar_dir)
+
+    if parquet_path is None:
+        parquet_path = PARQUET_PATH if ENGINE == "duckdb" else ""
+    if parquet_path:
+        export_parquet(db_path, parquet_path)
+
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a healthcare CSV into the SQLite database.")
+    parser.add_argument("csv_path", nargs="?", default=file_path, help="CSV file to import")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite database file")
+    parser.add_argument("--mode", choices=MODES, default="replace", help="How to treat rows already in the table")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE, help="Rows per chunk/transaction")
+    parser.add_argument("--columnar-dir", default=COLUMNAR_DIR, help="Also export a columnar snapshot to this directory")
+    parser.add_argument("--parquet", help="Also write a Parquet copy for the DuckDB engine to this file")
+    parser.add_argument("--migrate", action="store_true", help="Only migrate the existing table to the current schema")
+    args = parser.parse_args()
+
+    if args.migrate:
+        conn = connect(args.db)
+        try:
+            with conn:
+                changes = migrate_schema(conn)
+                create_default_indexes(conn)
+                rebuild_catalog(conn)
+        finally:
+            conn.close()
+        print(f"Migrated healthcare_data: {'; '.join(changes)}" if changes else "healthcare_data is up to date.")
+        return
 
-# Insert data into the database
-df.to_sql("healthcare_data", conn, if_exists="replace", index=False)
+    total = ingest_csv(args.csv_path, args.db, args.mode, args.chunksize, args.columnar_dir, args.parquet)
+    print(f"Healthcare CSV cleaned and imported successfully! ({total} rows)")
 
-# Commit and close connection
-conn.commit()
-conn.close()
 
-print("Healthcare CSV cleaned and imported successfully!")
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,53 @@
-import os
-import sqlite3
-import pandas as pd
+from back_end.application.dictionary import DICTIONARY_COLUMNS, read_dictionary
+from back_end.application.pool import read_pool
 
-DB_PATH = r"E:/Healthcare_chat_AI/data/veludb.db"
-# print("Database exists:", os.path.exists(DB_PATH))
+# Rows converted to categoricals at a time, so the full text columns are never held at once
+LOAD_CHUNK_SIZE = 100000
 
 
-def fetch_data():
-    conn = sqlite3.connect(DB_PATH)
-    query = "SELECT * FROM healthcare_data;"  # Fetch 5 rows
-    df = pd.read_sql(query, conn)
-    conn.close()
-    return df
+def _to_categorical(values, dtype):
+    import pandas as pd
+
+    categorical = values.astype(dtype)
+    unknown = values[categorical.isna() & values.notna()].unique().tolist()
+    if unknown:
+        # Values missing from the dictionary (rows written outside ingest)
+        dtype = pd.CategoricalDtype(list(dtype.categories) + sorted(unknown))
+        categorical = values.astype(dtype)
+    return categorical
+
 
-df =fetch_data()
-df.drop_duplicates(inplace=True)
-# print(df)  # Display the first 5 rows
+def load_table(conn, chunksize=LOAD_CHUNK_SIZE):
+    """
+    Loads healthcare_data with the dictionary-encoded columns as pandas categoricals.
+    Categories are in dictionary code order, so the categorical codes are the stored codes.
+    """
+    import pandas as pd
 
+    dictionary = read_dictionary(conn)
+    dtypes = {col: pd.CategoricalDtype(values) for col, values in (dictionary or {}).items()}
 
+    query = "SELECT * FROM healthcare_data;"
+    chunks = []
+    for chunk in pd.read_sql(query, conn, chunksize=chunksize):
+        for col in DICTIONARY_COLUMNS:
+            if col in chunk.columns:
+                if dictionary is None:
+                    # Tables imported before the dictionary may hold untrimmed values
+                    chunk[col] = chunk[col].astype("string").str.strip()
+                chunk[col] = _to_categorical(chunk[col], dtypes.get(col, pd.CategoricalDtype([])))
+                dtypes[col] = chunk[col].dtype
+        chunks.append(chunk)
+    if not chunks:
+        return pd.read_sql(f"SELECT * FROM ({query.rstrip(';')}) LIMIT 0;", conn)
 
+    # Earlier chunks may lack categories that a later chunk added
+    for chunk in chunks:
+        for col, dtype in dtypes.items():
+            if col in chunk.columns and chunk[col].dtype != dtype:
+                chunk[col] = chunk[col].cat.set_categories(dtype.categories)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def fetch_data():
+    return load_table(read_pool.connection())
@@ -0,0 +1,108 @@
+"""
+Dictionary (lookup) tables for the low-cardinality text columns.
+
+Gender, Blood_Type, Medical_Condition, Admission_Type, Insurance_Provider,
+Medication and Test_Results each take a handful of distinct values. Ingest
+records every distinct value once in healthcare_dictionary with a stable
+integer code. The loader in database.py turns the columns into pandas
+categoricals whose categories are in code order, so the code of each row is
+its dictionary code: one small int8 per row instead of a Python string,
+stable across reloads and appends, and group-bys that count on the codes.
+
+The encoding is in memory only. healthcare_data keeps the text values, so
+SQL generated by the LLM (`WHERE Gender = 'Male'`) and the indexes on these
+columns keep working, and the SQLite file is not any smaller.
+"""
+
+import sqlite3
+
+DICTIONARY_COLUMNS = (
+    "Gender",
+    "Blood_Type",
+    "Medical_Condition",
+    "Admission_Type",
+    "Insurance_Provider",
+    "Medication",
+    "Test_Results",
+)
+
+CREATE_DICTIONARY = """
+CREATE TABLE IF NOT EXISTS healthcare_dictionary (
+    column_name TEXT NOT NULL,
+    code INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (column_name, code),
+    UNIQUE (column_name, value)
+)
+"""
+
+INSERT_VALUE = "INSERT OR IGNORE INTO healthcare_dictionary (column_name, code, value) VALUES (?, ?, ?)"
+
+
+def ensure_dictionary_table(conn):
+    conn.execute(CREATE_DICTIONARY)
+
+
+def reset_dictionary(conn):
+    """
+    Removes all dictionary entries (used when healthcare_data is recreated).
+    """
+    ensure_dictionary_table(conn)
+    conn.execute("DELETE FROM healthcare_dictionary")
+
+
+def _add_values(conn, column, values):
+    known = {row[0] for row in conn.execute("SELECT value FROM healthcare_dictionary WHERE column_name = ?", (column,))}
+    new_values = sorted(value for value in set(values) if value not in known)
+    if not new_values:
+        return
+    next_code = conn.execute(
+        "SELECT COALESCE(MAX(code) + 1, 0) FROM healthcare_dictionary WHERE column_name = ?", (column,)
+    ).fetchone()[0]
+    conn.executemany(INSERT_VALUE, [(column, next_code + i, value) for i, value in enumerate(new_values)])
+
+
+def update_dictionary(conn, df):
+    """
+    Adds the values of a batch of newly ingested rows that are not in the dictionary yet.
+    """
+    ensure_dictionary_table(conn)
+    for column in DICTIONARY_COLUMNS:
+        if column in df.columns:
+            _add_values(conn, column, df[column].dropna().unique().tolist())
+
+
+def rebuild_dictionary(conn):
+    """
+    Recomputes the dictionary from the distinct values in healthcare_data,
+    trimming values stored before ingest trimmed them.
+    """
+    reset_dictionary(conn)
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(healthcare_data)")}
+    for column in DICTIONARY_COLUMNS:
+        if column in existing:
+            conn.execute(f"UPDATE healthcare_data SET {column} = TRIM({column}) WHERE {column} != TRIM({column})")
+            values = conn.execute(f"SELECT DISTINCT {column} FROM healthcare_data WHERE {column} IS NOT NULL")
+            _add_values(conn, column, [row[0] for row in values])
+
+
+def is_empty(conn):
+    ensure_dictionary_table(conn)
+    return conn.execute("SELECT 1 FROM healthcare_dictionary LIMIT 1").fetchone() is None
+
+
+def read_dictionary(conn):
+    """
+    Returns {column: [values in code order]}, or None if no dictionary has been built.
+    """
+    try:
+        rows = conn.execute("SELECT column_name, value FROM healthcare_dictionary ORDER BY column_name, code").fetchall()
+    except sqlite3.OperationalError:
+        # The dictionary table has not been created yet
+        return None
+    if not rows:
+        return None
+    dictionary = {}
+    for column, value in rows:
+        dictionary.setdefault(column, []).append(value)
+    return dictionary
@@ -0,0 +1,259 @@
+"""
+Query engines behind execute_sql_query() and the /health aggregations.
+
+SQLiteEngine is the default and keeps the existing behavior: generated SQL
+runs on the read-only SQLite pool, and group-bys are answered from the
+rollups, the columnar export or the pandas snapshot.
+
+DuckDBEngine runs the same SQL with DuckDB over a Parquet copy of
+healthcare_data. DuckDB's columnar, multi-threaded execution is much faster
+for the wide scans and GROUP BYs analysts ask for. Ingest writes the Parquet
+file after loading SQLite, which stays the source of truth. The file is
+replaced atomically, so queries never see a partial file.
+
+Select the engine with HEALTHCARE_ENGINE=sqlite|duckdb. The Parquet
+location defaults to the database path with a .parquet extension
+(HEALTHCARE_PARQUET_PATH). duckdb is only imported when the DuckDB engine
+is used.
+"""
+
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+
+from back_end.application import sql_guard
+from back_end.application.pagination import count_query, page_query, strip_statement
+from back_end.application.pool import DB_PATH, ConnectionPool, connect, read_pool
+
+ENGINE = os.getenv("HEALTHCARE_ENGINE", "sqlite").lower()
+ENGINES = ("sqlite", "duckdb")
+
+PARQUET_PATH = os.getenv("HEALTHCARE_PARQUET_PATH", "") or os.path.splitext(DB_PATH)[0] + ".parquet"
+
+TABLE = "healthcare_data"
+
+
+def quote_identifier(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def quote_literal(value):
+    return "'" + value.replace("'", "''") + "'"
+
+
+class SQLiteEngine:
+    name = "sqlite"
+
+    # Group-bys are left to the rollups, columnar export and snapshot
+    analytical = False
+
+    def __init__(self, pool=read_pool):
+        self.pool = pool
+
+    def connection(self):
+        return self.pool.connection()
+
+    def check_query(self, conn, sql_query, params=()):
+        sql_guard.check_query(conn, sql_query, params)
+
+    def time_budget(self, conn):
+        return sql_guard.time_budget(conn)
+
+    def fetch(self, conn, sql_query, params=(), max_rows=None):
+        """
+        Runs a query and returns (column names, rows), reading at most max_rows rows.
+        """
+        cursor = conn.execute(sql_query, params)
+        try:
+            rows = cursor.fetchall() if max_rows is None else cursor.fetchmany(max_rows)
+            columns = [desc[0] for desc in cursor.description] if cursor.description else []
+        finally:
+            cursor.close()
+        return columns, rows
+
+    def fetch_page(self, conn, sql_query, params, limit, offset):
+        return self.fetch(conn, page_query(sql_query), (*params, limit, offset), limit)
+
+    def count_rows(self, conn, sql_query, params, cap):
+        """
+        Counts the rows of a query, stopping at cap.
+        """
+        _, rows = self.fetch(conn, count_query(sql_query, limited=True), (*params, cap))
+        return rows[0][0]
+
+    def close(self):
+        # The read pool is shared with the rest of the application
+        pass
+
+
+class DuckDBPool(ConnectionPool):
+    """
+    One DuckDB cursor per thread over a shared in-memory database that exposes the Parquet file as healthcare_data.
+    """
+
+    def __init__(self, parquet_path):
+        super().__init__(parquet_path, readonly=True)
+        self._base = None
+        self._base_lock = threading.Lock()
+
+    def _open(self):
+        import duckdb
+
+        with self._base_lock:
+            if self._base is None:
+                base = duckdb.connect(":memory:")
+                base.execute(f"CREATE VIEW {TABLE} AS SELECT * FROM read_parquet({quote_literal(self.db_path)})")
+                self._base = base
+            return self._base.cursor()
+
+    def close_all(self):
+        super().close_all()
+        with self._base_lock:
+            if self._base is not None:
+                self._base.close()
+                self._base = None
+
+
+class DuckDBEngine:
+    name = "duckdb"
+    analytical = True
+
+    def __init__(self, parquet_path=PARQUET_PATH):
+        self.parquet_path = parquet_path
+        self.pool = DuckDBPool(parquet_path)
+
+    def connection(self):
+        return self.pool.connection()
+
+    def check_query(self, conn, sql_query, params=()):
+        sql_guard.check_statement(sql_query)
+        plan = "\n".join(str(row[-1]) for row in conn.execute(f"EXPLAIN {sql_query}", params).fetchall())
+        if "CROSS_PRODUCT" in plan:
+            sql_guard.reject("cartesian_join", "The query joins tables without a join condition")
+
+    @contextmanager
+    def time_budget(self, conn, seconds=sql_guard.TIME_BUDGET):
+        import duckdb
+
+        timer = threading.Timer(seconds, conn.interrupt)
+        timer.start()
+        try:
+            yield
+        except duckdb.InterruptException:
+            raise sql_guard.aborted(seconds)
+        finally:
+            timer.cancel()
+
+    def fetch(self, conn, sql_query, params=(), max_rows=None):
+        result = conn.execute(sql_query, params)
+        rows = result.fetchall() if max_rows is None else result.fetchmany(max_rows)
+        columns = [desc[0] for desc in result.description] if result.description else []
+        return columns, rows
+
+    # DuckDB ignores interrupt() while running a statement whose LIMIT is a bound
+    # parameter, so the page bounds are inlined (they are always integers we computed)
+
+    def fetch_page(self, conn, sql_query, params, limit, offset):
+        sql = f"SELECT * FROM ({strip_statement(sql_query)}) LIMIT {int(limit)} OFFSET {int(offset)}"
+        return self.fetch(conn, sql, params, limit)
+
+    def count_rows(self, conn, sql_query, params, cap):
+        sql = f"SELECT COUNT(*) FROM (SELECT 1 FROM ({strip_statement(sql_query)}) LIMIT {int(cap)})"
+        _, rows = self.fetch(conn, sql, params)
+        return rows[0][0]
+
+    def columns(self):
+        """
+        Returns the column names of healthcare_data, or None if no Parquet file has been written yet.
+        """
+        if not os.path.exists(self.parquet_path):
+            return None
+        return [row[0] for row in self.connection().execute(f"DESCRIBE {TABLE}").fetchall()]
+
+    def group_by(self, by, func="count", column=None):
+        """
+        Computes a count, sum or average per group, as [(key tuple, value), ...] sorted by key.
+        """
+        import duckdb
+
+        keys = ", ".join(quote_identifier(col) for col in by)
+        metric = "COUNT(*)" if func == "count" else f"{func.upper()}({quote_identifier(column)})"
+        not_null = " AND ".join(f"{quote_identifier(col)} IS NOT NULL" for col in by)
+        sql = f"SELECT {keys}, {metric} FROM {TABLE} WHERE {not_null} GROUP BY {keys} ORDER BY {keys}"
+        try:
+            rows = self.connection().execute(sql).fetchall()
+        except duckdb.BinderException:
+            raise ValueError(f"Column '{column}' is not numeric")
+        return [(tuple(row[:-1]), row[-1]) for row in rows]
+
+    def close(self):
+        self.pool.close_all()
+
+
+def export_parquet(db_path=DB_PATH, parquet_path=PARQUET_PATH):
+    """
+    Writes healthcare_data to a Parquet file for the DuckDB engine, replacing the previous file atomically.
+    """
+    import duckdb
+    from back_end.application.database import load_table
+
+    conn = connect(db_path, readonly=True)
+    try:
+        df = load_table(conn)
+    finally:
+        conn.close()
+
+    tmp_path = f"{parquet_path}.{uuid.uuid4().hex}.tmp"
+    duck = duckdb.connect(":memory:")
+    try:
+        duck.register("healthcare_frame", df)
+        duck.execute(f"COPY (SELECT * FROM healthcare_frame) TO {quote_literal(tmp_path)} (FORMAT PARQUET, COMPRESSION ZSTD)")
+    finally:
+        duck.close()
+    os.replace(tmp_path, parquet_path)
+    return parquet_path
+
+
+def create_engine(name=ENGINE):
+    if name == "sqlite":
+        return SQLiteEngine()
+    if name == "duckdb":
+        return DuckDBEngine()
+    raise ValueError(f"Unsupported engine '{name}', expected one of {', '.join(ENGINES)}")
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """
+    Returns the engine selected by HEALTHCARE_ENGINE, created on first use.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_engine(ENGINE)
+    return _engine
+
+
+def use_engine(name):
+    """
+    Switches the process to another engine (used by the benchmarks) and returns it.
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.close()
+        _engine = create_engine(name)
+    return _engine
+
+
+def close_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.close()
+            _engine = None
@@ -0,0 +1,131 @@
+"""
+Deterministic rendering of query results.
+
+Most chat answers are a single number or a small group-by table, and the
+second LLM call in refine_response() only rephrases them. format_result()
+classifies a query result and renders these common shapes from templates.
+It returns None for results that really need prose, and only those are
+sent to the LLM.
+"""
+
+import re
+
+# Largest result rendered as a table instead of being summarized by the LLM
+MAX_TABLE_ROWS = 15
+MAX_TABLE_COLUMNS = 4
+
+AGGREGATE_LABELS = {
+    "COUNT": "number of",
+    "COUNT_STAR": "number of",
+    "AVG": "average",
+    "SUM": "total",
+    "MIN": "minimum",
+    "MAX": "maximum",
+}
+
+# Aliases a count is often given; only trusted for integer values
+COUNT_ALIASES = ("count", "total", "n")
+
+
+def classify_result(query_result):
+    """
+    Returns "error", "message", "empty", "scalar", "table" or "prose" for a query result.
+    """
+    if query_result.get("status") != "success":
+        return "error"
+
+    data = query_result.get("data")
+    if isinstance(data, str):
+        return "message"
+    if not data:
+        return "empty"
+    if "next_page_token" in query_result:
+        return "prose"
+
+    columns = len(data[0])
+    if len(data) == 1 and columns == 1:
+        # An aggregate over no rows is NULL
+        return "empty" if next(iter(data[0].values())) is None else "scalar"
+    if len(data) <= MAX_TABLE_ROWS and columns <= MAX_TABLE_COLUMNS:
+        return "table"
+    return "prose"
+
+
+def describe_column(name):
+    """
+    Turns a result column such as "AVG(Billing_Amount)" into "average Billing Amount".
+    """
+    match = re.match(r"^\s*(\w+)\s*\(\s*(?:DISTINCT\s+)?(.*?)\s*\)\s*$", name, re.IGNORECASE)
+    if match and match.group(1).upper() in AGGREGATE_LABELS:
+        target = match.group(2)
+        target = "records" if target in ("", "*") else target.replace("_", " ")
+        return f"{AGGREGATE_LABELS[match.group(1).upper()]} {target}"
+    return name.replace("_", " ")
+
+
+def format_value(value):
+    if isinstance(value, bool) or value is None:
+        return str(value)
+    if isinstance(value, int):
+        return f"{value:,}"
+    if isinstance(value, float):
+        return f"{value:,.2f}"
+    return str(value)
+
+
+def aliased_expression(sql_query, alias):
+    """
+    Returns the aggregate a result column is aliased from, e.g. "SUM(Billing_Amount)" for
+    "SUM(Billing_Amount) AS total", or None if the SQL does not show it.
+    """
+    match = re.search(
+        rf"(\w+\s*\([^()]*\))\s+AS\s+[\"'`]?{re.escape(alias)}(?![\w])", sql_query or "", re.IGNORECASE
+    )
+    return match.group(1) if match else None
+
+
+def format_scalar(column, value, sql_query=None):
+    expression = aliased_expression(sql_query, column) or column
+    # DuckDB names an unaliased COUNT(*) column "count_star()"
+    if re.match(r"^\s*COUNT(_STAR)?\s*\(", expression, re.IGNORECASE):
+        is_count = True
+    else:
+        # An alias like "total" only means a count when the SQL does not say otherwise and the value is whole
+        is_count = (
+            expression == column and column.lower() in COUNT_ALIASES
+            and isinstance(value, int) and not isinstance(value, bool)
+        )
+    if is_count:
+        return f"There are {format_value(value)} matching records."
+    return f"The {describe_column(expression)} is {format_value(value)}."
+
+
+def format_table(rows):
+    columns = list(rows[0].keys())
+    lines = [
+        "| " + " | ".join(describe_column(col) for col in columns) + " |",
+        "|" + "---|" * len(columns),
+    ]
+    for row in rows:
+        lines.append("| " + " | ".join(format_value(row[col]) for col in columns) + " |")
+    return "\n".join(lines)
+
+
+def format_result(query_result, sql_query=None):
+    """
+    Renders a query result without the LLM, or returns None if it needs a prose summary.
+    The SQL, when given, tells what an aliased scalar column holds.
+    """
+    kind = classify_result(query_result)
+    if kind == "error":
+        return f"Sorry, I couldn't answer that: {query_result.get('message', 'the query failed.')}"
+    if kind == "message":
+        return query_result["data"]
+    if kind == "empty":
+        return "No matching records found."
+    if kind == "scalar":
+        (column, value), = query_result["data"][0].items()
+        return format_scalar(column, value, sql_query)
+    if kind == "table":
+        return format_table(query_result["data"])
+    return None
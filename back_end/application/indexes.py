@@ -0,0 +1,160 @@
+"""
+Index management for healthcare_data.
+
+Ingest creates DEFAULT_INDEXES on the columns that dashboard and chat
+queries filter on. IndexAdvisor records the SQL that execute_sql_query()
+runs, checks each statement with EXPLAIN QUERY PLAN, and recommends an index
+for every column that is filtered on by queries that still scan the table.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+
+TABLE = "healthcare_data"
+
+# Columns indexed at ingest
+DEFAULT_INDEXES = [
+    ("Medical_Condition",),
+    ("Gender",),
+    ("Blood_Type",),
+    ("Hospital",),
+    ("Doctor",),
+    ("Insurance_Provider",),
+    ("Admission_Type",),
+    ("Test_Results",),
+    ("Date_of_Admission",),
+    ("Admission_Day",),
+    ("Length_of_Stay",),
+]
+
+# Comparison operators that make a column a filter predicate
+PREDICATE_PATTERN = r"\b{column}\b\s*(=|==|<|>|<=|>=|!=|<>|\bLIKE\b|\bIN\b|\bBETWEEN\b|\bIS\b)"
+
+
+def index_name(columns):
+    return f"idx_{TABLE}_" + "_".join(col.lower() for col in columns)
+
+
+def create_index(conn, columns):
+    """
+    Creates an index on the columns and returns its name, or None if a column is missing from the table.
+    """
+    if not set(columns).issubset(table_columns(conn)):
+        return None
+    name = index_name(columns)
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {TABLE} ({', '.join(columns)})")
+    return name
+
+
+def create_default_indexes(conn):
+    """
+    Creates the built-in index set (skipping columns an older table lacks), then refreshes the planner statistics.
+    """
+    names = [name for name in (create_index(conn, columns) for columns in DEFAULT_INDEXES) if name]
+    conn.execute("ANALYZE;")
+    return names
+
+
+def table_columns(conn):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({TABLE})")]
+
+
+def predicate_columns(sql, columns):
+    """
+    Returns the columns compared against a value in the WHERE clause of a query.
+    """
+    match = re.search(r"\bWHERE\b(.*)", sql, re.IGNORECASE | re.DOTALL)
+    if not match:
+        return []
+    where = re.split(r"\b(GROUP\s+BY|ORDER\s+BY|LIMIT|HAVING)\b", match.group(1), flags=re.IGNORECASE)[0]
+    return [
+        col for col in columns
+        if re.search(PREDICATE_PATTERN.format(column=re.escape(col)), where, re.IGNORECASE)
+    ]
+
+
+def explain(conn, sql):
+    """
+    Returns the detail lines of EXPLAIN QUERY PLAN for a query.
+    """
+    return [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()]
+
+
+def is_full_scan(plan):
+    # SQLite prints "SCAN healthcare_data" (or "SCAN TABLE healthcare_data" before 3.36)
+    # for a table scan; index scans mention the index they use
+    return any(
+        re.match(rf"SCAN (TABLE )?{TABLE}\b", line) and "INDEX" not in line
+        for line in plan
+    )
+
+
+class IndexAdvisor:
+    """
+    Records executed queries and recommends indexes for the predicates of full scans.
+    """
+
+    def __init__(self, max_queries=500):
+        self.max_queries = max_queries
+        self._lock = threading.Lock()
+        self._queries = OrderedDict()
+
+    def record(self, sql):
+        sql = " ".join(sql.split()).rstrip(";")
+        with self._lock:
+            self._queries[sql] = self._queries.pop(sql, 0) + 1
+            while len(self._queries) > self.max_queries:
+                self._queries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._queries.clear()
+
+    def report(self, conn):
+        """
+        Explains every recorded query and returns the full scans and the recommended indexes.
+        """
+        with self._lock:
+            queries = list(self._queries.items())
+        columns = table_columns(conn)
+
+        scans = []
+        hot_columns = {}
+        for sql, executions in queries:
+            try:
+                plan = explain(conn, sql)
+            except Exception:
+                # The table or a column changed since the query ran
+                continue
+            if not is_full_scan(plan):
+                continue
+
+            predicates = predicate_columns(sql, columns)
+            scans.append({"sql": sql, "executions": executions, "plan": plan, "predicates": predicates})
+            for col in predicates:
+                hot_columns[col] = hot_columns.get(col, 0) + executions
+
+        recommendations = [
+            {"columns": [col], "index": index_name((col,)), "executions": executions}
+            for col, executions in sorted(hot_columns.items(), key=lambda item: item[1], reverse=True)
+        ]
+        return {"queries": len(queries), "scans": scans, "recommendations": recommendations}
+
+    def apply(self, conn, min_executions=1):
+        """
+        Creates the recommended indexes whose predicates ran at least min_executions times.
+        """
+        report = self.report(conn)
+        created = [
+            create_index(conn, rec["columns"])
+            for rec in report["recommendations"]
+            if rec["executions"] >= min_executions
+        ]
+        if created:
+            conn.execute("ANALYZE;")
+        conn.commit()
+        return created
+
+
+advisor = IndexAdvisor()
@@ -0,0 +1,265 @@
+"""
+Local intent matching for common chat questions.
+
+Many prompts ("how many male patients", "average billing for cancer",
+"patients admitted in 2023 at hospital X") map to a few parameterized
+queries over healthcare_data. match_intent() recognizes them without
+calling the LLM.
+
+Filter values are found by looking the prompt's n-grams up in a lexicon
+built from the distinct values of the categorical columns. The lexicon is
+rebuilt when the database changes. A prompt only matches if every word in
+it is understood: a metric, a filter, a group-by, or a known filler word.
+Anything else falls back to get_sql_query(). Values are always bound as
+parameters, never pasted into the SQL.
+"""
+
+import re
+import threading
+from collections import namedtuple
+
+from back_end.application.pool import read_pool
+from back_end.application.snapshot import snapshot
+
+TABLE = "healthcare_data"
+
+# Columns whose distinct values make up the lexicon, in priority order for ambiguous values
+LEXICON_COLUMNS = [
+    "Gender",
+    "Blood_Type",
+    "Medical_Condition",
+    "Admission_Type",
+    "Test_Results",
+    "Insurance_Provider",
+    "Medication",
+    "Hospital",
+    "Doctor",
+]
+
+SYNONYMS = {
+    "men": ("Gender", "Male"),
+    "males": ("Gender", "Male"),
+    "women": ("Gender", "Female"),
+    "females": ("Gender", "Female"),
+}
+
+# Phrases naming a column after "by", "per" or "each"
+COLUMN_PHRASES = {
+    "gender": "Gender",
+    "blood type": "Blood_Type",
+    "blood group": "Blood_Type",
+    "medical condition": "Medical_Condition",
+    "condition": "Medical_Condition",
+    "admission type": "Admission_Type",
+    "test result": "Test_Results",
+    "test results": "Test_Results",
+    "insurance provider": "Insurance_Provider",
+    "insurance": "Insurance_Provider",
+    "medication": "Medication",
+    "hospital": "Hospital",
+    "doctor": "Doctor",
+}
+
+COUNT_WORDS = {"how many", "number of", "count"}
+AVG_WORDS = {"average", "avg", "mean"}
+SUM_WORDS = {"total", "sum"}
+LIST_WORDS = {"list", "show", "which", "who"}
+BILLING_WORDS = {"billing", "bill", "bills", "billed", "amount", "cost", "costs", "charges", "charged"}
+
+# Words that carry no meaning beyond the intent, filters and group-by
+FILLER_WORDS = {
+    "a", "an", "the", "of", "is", "are", "was", "were", "there", "do", "does", "did", "we", "have", "has",
+    "had", "what", "whats", "s", "me", "all", "patients", "patient", "people", "persons", "records",
+    "record", "cases", "admitted", "admissions", "in", "at", "to", "for", "with", "who",
+    "that", "from", "during", "year", "on", "diagnosed", "treated", "taking", "insured",
+    "by", "per", "each", "hospital", "doctor", "dr", "type", "blood", "result", "results", "test",
+    "tests", "condition", "conditions", "provider", "medication", "please", "give", "tell", "age",
+    "aged", "their", "admission", "gender",
+}
+
+# Negated filters ("without cancer") are left to the LLM
+NEGATION_WORDS = {"without", "not", "no", "non", "never", "excluding", "except", "exclude", "excluded"}
+
+IntentMatch = namedtuple("IntentMatch", ["intent", "sql", "params"])
+
+
+def tokenize(text):
+    return re.findall(r"[a-z0-9][a-z0-9+\-']*|[+\-]", text.lower().replace("’", "'"))
+
+
+class Lexicon:
+    """
+    Maps the tokenized distinct values of the categorical columns back to (column, value).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self.values = {}
+        self.max_tokens = 1
+
+    def _build(self):
+        conn = read_pool.connection()
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({TABLE})")}
+        values, max_tokens = {}, 1
+        for column in reversed(LEXICON_COLUMNS):
+            if column not in existing:
+                continue
+            for (value,) in conn.execute(f"SELECT DISTINCT {column} FROM {TABLE} WHERE {column} IS NOT NULL"):
+                key = tuple(tokenize(str(value)))
+                if key:
+                    # Reversed iteration lets earlier columns win for shared values
+                    values[key] = (column, value)
+                    max_tokens = max(max_tokens, len(key))
+        self.values, self.max_tokens = values, min(max_tokens, 8)
+
+    def refresh_if_changed(self):
+        with self._lock:
+            version = snapshot.fingerprint()
+            if version != self._version:
+                self._build()
+                self._version = version
+
+    def lookup(self, tokens):
+        return self.values.get(tuple(tokens))
+
+
+lexicon = Lexicon()
+
+
+def _extract_ages(text, conditions, params):
+    """
+    Moves the age bounds of the text into conditions. Returns None if they are joined
+    by "or" or cannot all hold (e.g. "under 18 and over 60"), which ANDed conditions would get wrong.
+    """
+    patterns = [
+        (r"\b(?:older than|over|above|more than)\s+(\d{1,3})", "Age > ?"),
+        (r"\b(?:younger than|under|below|less than)\s+(\d{1,3})", "Age < ?"),
+        (r"\baged?\s+(\d{1,3})\b", "Age = ?"),
+    ]
+    bounds = []
+    for pattern, condition in patterns:
+        for match in re.finditer(pattern, text):
+            bounds.append((condition, int(match.group(1))))
+        text = re.sub(pattern, " ", text)
+
+    if len(bounds) > 1 and re.search(r"\bor\b", text):
+        return None
+    low = max([age + 1 for condition, age in bounds if condition == "Age > ?"], default=0)
+    high = min([age - 1 for condition, age in bounds if condition == "Age < ?"], default=999)
+    exact = {age for condition, age in bounds if condition == "Age = ?"}
+    if low > high or len(exact) > 1 or any(not low <= age <= high for age in exact):
+        return None
+
+    for condition, age in bounds:
+        conditions.append(condition)
+        params.append(age)
+    return text
+
+
+def _extract_years(text, conditions, params):
+    years = [int(year) for year in re.findall(r"\b((?:19|20)\d{2})\b", text)]
+    if len(years) == 1:
+        conditions.append("Date_of_Admission >= ? AND Date_of_Admission < ?")
+        params.extend([f"{years[0]}-01-01", f"{years[0] + 1}-01-01"])
+    elif len(years) == 2:
+        start, end = sorted(years)
+        conditions.append("Date_of_Admission >= ? AND Date_of_Admission < ?")
+        params.extend([f"{start}-01-01", f"{end + 1}-01-01"])
+    elif years:
+        return None
+    return re.sub(r"\b(?:19|20)\d{2}\b", " ", text)
+
+
+def _phrase_in(tokens, phrases):
+    text = " " + " ".join(tokens) + " "
+    return any(f" {phrase} " in text for phrase in phrases)
+
+
+def _extract_group_by(tokens):
+    text = " ".join(tokens)
+    for phrase, column in sorted(COLUMN_PHRASES.items(), key=lambda item: -len(item[0])):
+        if re.search(rf"\b(?:by|per|each|for each|across)\s+{re.escape(phrase)}\b", text):
+            return column
+    return None
+
+
+def match_intent(prompt):
+    """
+    Returns an IntentMatch with parameterized SQL for a recognized prompt, or None.
+    """
+    lexicon.refresh_if_changed()
+
+    conditions, params = [], []
+    text = prompt.lower()
+    text = _extract_ages(text, conditions, params)
+    if text is None:
+        return None
+    text = _extract_years(text, conditions, params)
+    if text is None:
+        return None
+    tokens = tokenize(text)
+    if not tokens or any(
+        token in NEGATION_WORDS or token.startswith("non-") or token.endswith("n't") for token in tokens
+    ):
+        return None
+
+    # Longest-first n-gram matching of lexicon values
+    filters, understood = {}, [False] * len(tokens)
+    i = 0
+    while i < len(tokens):
+        for size in range(min(lexicon.max_tokens, len(tokens) - i), 0, -1):
+            found = lexicon.lookup(tokens[i:i + size]) or (SYNONYMS.get(tokens[i]) if size == 1 else None)
+            if found:
+                column, value = found
+                filters.setdefault(column, [])
+                if value not in filters[column]:
+                    filters[column].append(value)
+                understood[i:i + size] = [True] * size
+                i += size
+                break
+        else:
+            i += 1
+
+    group_by = _extract_group_by(tokens)
+    has_billing = any(token in BILLING_WORDS for token in tokens)
+
+    if any(token in AVG_WORDS for token in tokens):
+        if has_billing:
+            intent, select = "average", "AVG(Billing_Amount)"
+        elif "age" in tokens:
+            intent, select = "average", "AVG(Age)"
+        else:
+            return None
+    elif has_billing and any(token in SUM_WORDS for token in tokens):
+        intent, select = "total", "SUM(Billing_Amount)"
+    elif _phrase_in(tokens, COUNT_WORDS) or (tokens[0] in SUM_WORDS and not has_billing):
+        intent, select = "count", "COUNT(*)"
+    elif (tokens[0] in LIST_WORDS or tokens[0] in ("patients", "patient")) and (filters or conditions):
+        intent, select = "list", "Name, Age, Gender, Medical_Condition, Hospital, Date_of_Admission"
+    else:
+        return None
+
+    known = FILLER_WORDS | COUNT_WORDS | AVG_WORDS | SUM_WORDS | LIST_WORDS | BILLING_WORDS | {"how", "many", "number"}
+    known |= {word for phrase in COLUMN_PHRASES for word in phrase.split()} | {"across"}
+    if not all(done or token in known for token, done in zip(tokens, understood)):
+        return None
+
+    # "male patients by gender": a filter on the grouped column cannot be expressed as one group
+    if group_by and group_by in filters:
+        return None
+
+    for column, values in filters.items():
+        placeholders = ", ".join("?" for _ in values)
+        conditions.append(f"{column} IN ({placeholders})" if len(values) > 1 else f"{column} = ?")
+        params.extend(values)
+
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    if group_by and intent != "list":
+        sql = (
+            f"SELECT {group_by}, {select} FROM {TABLE}{where} "
+            f"GROUP BY {group_by} ORDER BY {select} DESC"
+        )
+    else:
+        sql = f"SELECT {select} FROM {TABLE}{where}"
+    return IntentMatch(intent, sql, tuple(params))
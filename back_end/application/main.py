@@ -3,17 +3,112 @@ import os
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 
-from fastapi import FastAPI
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from .routers import health
 from .routers import chatapi
+from back_end.application import metrics
+from back_end.application.columnar import columnar_snapshot
+from back_end.application.engines import close_engine
+from back_end.application.intents import lexicon
+from back_end.application.pool import read_pool
+from back_end.application.snapshot import snapshot
+
+logger = logging.getLogger(__name__)
+
+# Load the dataset snapshot and intent lexicon in the background after startup
+WARMUP = os.getenv("HEALTHCARE_WARMUP", "1").lower() not in ("0", "false", "no", "off")
+
+
+def warm_caches():
+    """
+    Loads the dataset snapshot and the intent lexicon, so the first requests don't pay for it.
+    """
+    if columnar_snapshot.enabled:
+        columnar_snapshot.get()
+    else:
+        snapshot.get()
+    lexicon.refresh_if_changed()
+
+
+async def run_warmup(app):
+    app.state.warmup = "running"
+    try:
+        await asyncio.to_thread(warm_caches)
+        app.state.warmup = "done"
+    except Exception:
+        logger.exception("Cache warmup failed")
+        app.state.warmup = "failed"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Startup does no blocking I/O: the server accepts requests (and health probes) at once,
+    while the caches warm up in a background task.
+    """
+    app.state.warmup = "disabled"
+    task = asyncio.create_task(run_warmup(app)) if WARMUP else None
+    yield
+    if task is not None:
+        task.cancel()
+    close_engine()
+    read_pool.close_all()
+
 
-app = FastAPI(title="Healthcare Data API", version="1.0")
+app = FastAPI(title="Healthcare Data API", version="1.0", lifespan=lifespan)
 
 # Include routers
 app.include_router(health.router,  tags=["Health"])
 app.include_router(chatapi.router, tags=['Chat'])
 
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """
+    Records per-route latency histograms and adds a Server-Timing header with the stage timings,
+    and X-LLM-Prompt-Tokens/X-LLM-Completion-Tokens headers when the request called the LLM.
+    """
+    if not metrics.ENABLED:
+        return await call_next(request)
+
+    timings = metrics.start_request_timings()
+    tokens = metrics.start_request_tokens()
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - start
+
+    route = request.scope.get("route")
+    path = route.path if route is not None else "unmatched"
+    metrics.registry.observe("healthcare_request_seconds", elapsed, route=path, method=request.method)
+    metrics.registry.inc("healthcare_requests_total", route=path, status=str(response.status_code))
+
+    timings.append(("total", elapsed))
+    response.headers["Server-Timing"] = metrics.server_timing_header(timings)
+    if tokens["prompt"] or tokens["completion"]:
+        response.headers["X-LLM-Prompt-Tokens"] = str(tokens["prompt"])
+        response.headers["X-LLM-Completion-Tokens"] = str(tokens["completion"])
+    return response
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/healthz")
+def healthz(request: Request):
+    """
+    Liveness/readiness probe; answers without touching the database.
+    """
+    return {"status": "ok", "warmup": getattr(request.app.state, "warmup", "disabled")}
+
+
 @app.get("/")
 def home():
     return {"messa ge": "API is running"}
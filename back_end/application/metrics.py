@@ -0,0 +1,229 @@
+"""
+Lightweight metrics for the chat and analytics pipelines.
+
+span() times a pipeline stage (SQL generation, SQLite, refinement,
+aggregation, ...) into a per-stage latency histogram. It also adds the
+stage to the current request's Server-Timing header. Counters track SQL
+row counts, LLM token usage, cache hits and rejected queries. The LLM tokens
+of a request are also returned in its X-LLM-*-Tokens headers.
+
+registry.render() produces the Prometheus text format served on /metrics.
+
+Set HEALTHCARE_METRICS=0 to disable collection. span() then returns a
+shared no-op context manager, and inc()/observe() return immediately.
+"""
+
+import contextvars
+import os
+import threading
+import time
+from bisect import bisect_left
+
+ENABLED = os.getenv("HEALTHCARE_METRICS", "1").lower() not in ("0", "false", "no", "off")
+
+# Latency buckets in seconds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Prompt sizes in tokens
+TOKEN_BUCKETS = (100, 250, 500, 750, 1000, 1500, 2000, 3000, 5000, 10000)
+
+# Stage timings of the request being handled, for the Server-Timing header
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+# LLM tokens used by the request being handled, for the X-LLM-*-Tokens headers
+_request_tokens = contextvars.ContextVar("request_tokens", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        (key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in pairs
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = []
+        self._help = {}
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    def inc(self, name, value=1, **labels):
+        if not ENABLED:
+            return
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        if not ENABLED:
+            return
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def register_collector(self, func):
+        """
+        Registers a callable returning (name, type, labels dict, value) samples computed at scrape time.
+        """
+        self._collectors.append(func)
+
+    def render(self):
+        """
+        Returns all metrics in the Prometheus text exposition format.
+        """
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+
+        lines, typed = [], set()
+
+        def header(name, kind):
+            if name not in typed:
+                typed.add(name)
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            header(name, "counter")
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        for (name, labels), histogram in histograms:
+            header(name, "histogram")
+            cumulative = 0
+            for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+        for collector in self._collectors:
+            for name, kind, labels, value in collector():
+                header(name, kind)
+                lines.append(f"{name}{_format_labels(_labels(labels))} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+registry.describe("healthcare_request_seconds", "HTTP request latency by route")
+registry.describe("healthcare_stage_seconds", "Latency of pipeline stages")
+registry.describe("healthcare_sql_rows_total", "Rows returned by executed SQL queries")
+registry.describe("healthcare_llm_tokens_total", "LLM tokens used, by stage and kind")
+registry.describe("healthcare_llm_prompt_tokens", "Prompt tokens per LLM call, by stage")
+registry.describe("healthcare_llm_errors_total", "LLM calls that failed, by stage")
+registry.describe("healthcare_answers_total", "Chat answers rendered from templates or by the LLM")
+
+
+class _Span:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        registry.observe("healthcare_stage_seconds", elapsed, stage=self.stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((self.stage, elapsed))
+        return False
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(stage):
+    """
+    Times a pipeline stage: `with span("sql_execution"): ...`
+    """
+    return _Span(stage) if ENABLED else _NOOP_SPAN
+
+
+def record_llm_usage(stage, completion):
+    """
+    Counts the prompt/completion tokens reported by a Groq completion.
+    """
+    usage = getattr(completion, "usage", None)
+    if not ENABLED or usage is None:
+        return
+    request_tokens = _request_tokens.get()
+    for kind in ("prompt", "completion"):
+        tokens = getattr(usage, f"{kind}_tokens", None)
+        if tokens:
+            registry.inc("healthcare_llm_tokens_total", tokens, stage=stage, kind=kind)
+            if request_tokens is not None:
+                request_tokens[kind] += tokens
+    if getattr(usage, "prompt_tokens", None):
+        registry.observe("healthcare_llm_prompt_tokens", usage.prompt_tokens, TOKEN_BUCKETS, stage=stage)
+
+
+def start_request_timings():
+    """
+    Starts collecting stage timings for the current request and returns the list they go into.
+    """
+    timings = []
+    _request_timings.set(timings)
+    return timings
+
+
+def start_request_tokens():
+    """
+    Starts counting the LLM tokens of the current request and returns the dict they are added to.
+    """
+    tokens = {"prompt": 0, "completion": 0}
+    _request_tokens.set(tokens)
+    return tokens
+
+
+def request_tokens():
+    """
+    Returns the LLM tokens counted so far for the current request, or None outside a request.
+    """
+    tokens = _request_tokens.get()
+    return None if tokens is None else dict(tokens)
+
+
+def server_timing_header(timings):
+    return ", ".join(f"{stage};dur={elapsed * 1000:.1f}" for stage, elapsed in timings)
@@ -0,0 +1,79 @@
+"""
+Bounded, paginated execution of generated SQL.
+
+A generated query such as "list all diabetic patients" can match thousands
+of rows. Instead of fetching all of them, the query is wrapped in a
+subquery with a LIMIT/OFFSET so at most one page is read. The continuation
+is handed to the client as an opaque page token.
+
+Page tokens carry the SQL, its parameters, the offset of the next page and
+the row count of the first page, so later pages are not counted again. They
+are signed with HMAC so clients cannot substitute their own SQL. Set
+HEALTHCARE_PAGE_TOKEN_SECRET when running several workers so that tokens
+issued by one worker are accepted by the others.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+
+# Rows returned per page of a generated query's result
+PAGE_SIZE = int(os.getenv("HEALTHCARE_PAGE_SIZE", "50"))
+
+_SECRET = os.getenv("HEALTHCARE_PAGE_TOKEN_SECRET", "").encode() or os.urandom(32)
+
+
+class InvalidPageToken(ValueError):
+    pass
+
+
+def strip_statement(sql_query):
+    return sql_query.strip().rstrip(";").strip()
+
+
+def page_query(sql_query):
+    """
+    Wraps a query so only one page of it is read; takes (limit, offset) parameters.
+    """
+    return f"SELECT * FROM ({strip_statement(sql_query)}) LIMIT ? OFFSET ?"
+
+
+def count_query(sql_query, limited=False):
+    """
+    Counts the rows of a query; a limited count takes the maximum to count up to as a parameter.
+    """
+    if limited:
+        return f"SELECT COUNT(*) FROM (SELECT 1 FROM ({strip_statement(sql_query)}) LIMIT ?)"
+    return f"SELECT COUNT(*) FROM ({strip_statement(sql_query)})"
+
+
+def _sign(payload):
+    return hmac.new(_SECRET, payload, hashlib.sha256).hexdigest()
+
+
+def encode_page_token(sql_query, offset, params=(), total_rows=None):
+    payload = base64.urlsafe_b64encode(
+        json.dumps({"sql": sql_query, "offset": offset, "params": list(params), "total": total_rows}).encode()
+    )
+    return f"{payload.decode()}.{_sign(payload)}"
+
+
+def decode_page_token(token):
+    """
+    Returns the (sql_query, offset, params, total_rows) of a page token, raising InvalidPageToken
+    if it was tampered with. total_rows is None for tokens issued without a count.
+    """
+    payload, _, signature = token.partition(".")
+    if not hmac.compare_digest(_sign(payload.encode()), signature):
+        raise InvalidPageToken("Invalid or expired page token")
+    try:
+        data = json.loads(base64.urlsafe_b64decode(payload.encode()))
+        total_rows = data.get("total")
+        return (
+            data["sql"], int(data["offset"]), tuple(data.get("params", ())),
+            None if total_rows is None else int(total_rows),
+        )
+    except (ValueError, KeyError, TypeError):
+        raise InvalidPageToken("Malformed page token")
@@ -0,0 +1,85 @@
+import os
+import sqlite3
+import threading
+from urllib.request import pathname2url
+
+"""
+Shared SQLite connections for the analytics and chat paths.
+
+Every module used to open and close its own sqlite3 connection per call,
+and not always to the same file. connect() applies the tuned PRAGMAs below,
+and ConnectionPool keeps one connection per worker thread alive so FastAPI's
+threadpool requests reuse it instead of paying connect/teardown each time.
+
+Readers open the database through a `mode=ro` URI, so LLM-generated SQL
+cannot modify it.
+"""
+
+DB_PATH = os.getenv("HEALTHCARE_DB_PATH", r"E:/Healthcare_chat_AI/data/veludb.db")
+
+# Bytes of the database file mapped into memory
+MMAP_SIZE = 256 * 1024 * 1024
+
+# Page cache per connection, in KiB
+CACHE_SIZE_KIB = 64 * 1024
+
+
+def connect(db_path=DB_PATH, readonly=False):
+    """
+    Opens a connection with the tuned PRAGMAs; writers also switch the file to WAL.
+    """
+    if readonly:
+        uri = f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    else:
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        # WAL lets the API keep reading while ingest writes
+        conn.execute("PRAGMA journal_mode = WAL;")
+        conn.execute("PRAGMA synchronous = NORMAL;")
+
+    conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE};")
+    conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KIB};")
+    conn.execute("PRAGMA temp_store = MEMORY;")
+    return conn
+
+
+class ConnectionPool:
+    """
+    Hands out one long-lived connection per thread.
+    """
+
+    def __init__(self, db_path=DB_PATH, readonly=True):
+        self.db_path = db_path
+        self.readonly = readonly
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._connections = {}
+
+    def _open(self):
+        return connect(self.db_path, self.readonly)
+
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+            with self._lock:
+                self._prune()
+                self._connections[threading.get_ident()] = conn
+        return conn
+
+    def _prune(self):
+        # Worker threads come and go; close connections whose thread has exited
+        alive = {thread.ident for thread in threading.enumerate()}
+        for ident in [ident for ident in self._connections if ident not in alive]:
+            self._connections.pop(ident).close()
+
+    def close_all(self):
+        with self._lock:
+            for conn in self._connections.values():
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+read_pool = ConnectionPool(DB_PATH, readonly=True)
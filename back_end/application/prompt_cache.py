@@ -0,0 +1,189 @@
+"""
+Persistent cache of natural-language prompts to generated SQL.
+
+Users ask the same handful of questions over and over, so get_sql_query()
+looks the prompt up here before calling the LLM. SQL is only cached once it
+has run successfully, and dropped when it no longer does. Prompts are normalized
+(case, whitespace and punctuation folded) before lookup. Optionally, a
+prompt whose tokens are similar enough to a cached prompt reuses that
+prompt's SQL.
+
+Entries live in an in-memory LRU with a TTL and are written through to a
+small SQLite file so they survive restarts.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from back_end.application.metrics import registry
+
+CACHE_PATH = os.getenv("HEALTHCARE_PROMPT_CACHE_PATH", "prompt_cache.db")
+MAX_ENTRIES = int(os.getenv("HEALTHCARE_PROMPT_CACHE_SIZE", "1000"))
+TTL_SECONDS = float(os.getenv("HEALTHCARE_PROMPT_CACHE_TTL", str(7 * 24 * 3600)))
+
+# Minimum token Jaccard similarity for a fuzzy hit; 0 disables fuzzy matching
+FUZZY_THRESHOLD = float(os.getenv("HEALTHCARE_PROMPT_CACHE_FUZZY", "0"))
+
+
+# Punctuation that changes the answer is kept in the key: the sign of a blood type (A+, O-),
+# decimal points, comparisons and percentages. Any other punctuation is folded to a space.
+PUNCTUATION = re.compile(r"(?<=\w)[+-](?!\w)|(?<=\d)\.(?=\d)|[<>=%]|([^\w\s])")
+
+
+def normalize_prompt(prompt):
+    """
+    Folds case, whitespace and punctuation that carries no meaning so trivially different prompts share a key.
+    """
+    prompt = PUNCTUATION.sub(lambda match: " " if match.group(1) else match.group(), prompt.lower())
+    return " ".join(prompt.split())
+
+
+def similarity(a, b):
+    tokens_a, tokens_b = set(a.split()), set(b.split())
+    if not tokens_a or not tokens_b:
+        return 0.0
+    return len(tokens_a & tokens_b) / len(tokens_a | tokens_b)
+
+
+class PromptCache:
+    def __init__(self, path=CACHE_PATH, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS, fuzzy_threshold=FUZZY_THRESHOLD):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.fuzzy_threshold = fuzzy_threshold
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # normalized prompt -> (sql, created_at)
+        self._conn = None
+        self.hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+
+    def _connection(self):
+        # Opened on first use, so importing the module does no I/O
+        if self._conn is None and self.path:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS prompt_cache (prompt TEXT PRIMARY KEY, sql TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._load(self._conn)
+        return self._conn
+
+    def _load(self, conn):
+        cutoff = time.time() - self.ttl
+        with conn:
+            conn.execute("DELETE FROM prompt_cache WHERE created_at < ?", (cutoff,))
+        rows = conn.execute(
+            "SELECT prompt, sql, created_at FROM prompt_cache ORDER BY created_at DESC LIMIT ?",
+            (self.max_entries,),
+        ).fetchall()
+        for prompt, sql, created_at in reversed(rows):
+            self._entries[prompt] = (sql, created_at)
+
+    def _expired(self, created_at):
+        return time.time() - created_at > self.ttl
+
+    def _fuzzy_lookup(self, key):
+        best_key, best_score = None, self.fuzzy_threshold
+        for candidate in self._entries:
+            score = similarity(key, candidate)
+            if score >= best_score:
+                best_key, best_score = candidate, score
+        return best_key
+
+    def get(self, prompt):
+        """
+        Returns the cached SQL for a prompt, or None on a miss.
+        """
+        key = normalize_prompt(prompt)
+        with self._lock:
+            self._connection()
+            entry = self._entries.get(key)
+            fuzzy = False
+            if entry is None and self.fuzzy_threshold > 0:
+                match = self._fuzzy_lookup(key)
+                if match is not None:
+                    key, entry, fuzzy = match, self._entries[match], True
+
+            if entry is None or self._expired(entry[1]):
+                if entry is not None:
+                    self._delete(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            if fuzzy:
+                self.fuzzy_hits += 1
+            else:
+                self.hits += 1
+            return entry[0]
+
+    def put(self, prompt, sql):
+        key = normalize_prompt(prompt)
+        created_at = time.time()
+        with self._lock:
+            conn = self._connection()
+            self._entries[key] = (sql, created_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._delete(next(iter(self._entries)))
+
+            if conn is not None:
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO prompt_cache (prompt, sql, created_at) VALUES (?, ?, ?)",
+                        (key, sql, created_at),
+                    )
+
+    def evict(self, prompt):
+        """
+        Drops the entry a prompt is answered from (its own, or the fuzzy match).
+        """
+        key = normalize_prompt(prompt)
+        with self._lock:
+            self._connection()
+            if key not in self._entries and self.fuzzy_threshold > 0:
+                key = self._fuzzy_lookup(key)
+            if key is not None:
+                self._delete(key)
+
+    def _delete(self, key):
+        self._entries.pop(key, None)
+        conn = self._connection()
+        if conn is not None:
+            with conn:
+                conn.execute("DELETE FROM prompt_cache WHERE prompt = ?", (key,))
+
+    def clear(self):
+        with self._lock:
+            conn = self._connection()
+            self._entries.clear()
+            if conn is not None:
+                with conn:
+                    conn.execute("DELETE FROM prompt_cache")
+
+    def stats(self):
+        lookups = self.hits + self.fuzzy_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "fuzzy_hits": self.fuzzy_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.fuzzy_hits) / lookups if lookups else 0.0,
+        }
+
+
+prompt_cache = PromptCache()
+
+
+def prompt_cache_samples():
+    stats = prompt_cache.stats()
+    for result in ("hits", "fuzzy_hits", "misses"):
+        yield "healthcare_prompt_cache_lookups_total", "counter", {"result": result}, stats[result]
+    yield "healthcare_prompt_cache_entries", "gauge", {}, stats["entries"]
+
+
+registry.register_collector(prompt_cache_samples)
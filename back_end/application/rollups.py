@@ -0,0 +1,182 @@
+"""
+Incrementally maintained rollups for the dashboard aggregates.
+
+Each rollup is a group-by over one or two columns of healthcare_data. Its
+row count and Billing_Amount sum are stored per group in the
+healthcare_rollups table, so the /health routes read O(number of groups)
+rows instead of scanning the full dataset.
+
+Ingest calls update_rollups() with every batch of new rows; the counts are
+added to the stored totals. rebuild_rollups() recomputes everything from
+healthcare_data with a single GROUP BY per rollup.
+"""
+
+import sqlite3
+
+# Rollup name -> grouped columns
+ROLLUPS = {
+    "gender": ("Gender",),
+    "blood_type": ("Blood_Type",),
+    "blood_condition": ("Blood_Type", "Medical_Condition"),
+    "gender_condition": ("Gender", "Medical_Condition"),
+    "admission_type": ("Admission_Type",),
+    "test_result": ("Test_Results",),
+    "admission_day": ("Admission_Day",),
+    "length_of_stay": ("Length_of_Stay",),
+}
+
+CREATE_ROLLUP_TABLE = """
+CREATE TABLE IF NOT EXISTS healthcare_rollups (
+    rollup TEXT NOT NULL,
+    key1 NOT NULL,
+    key2 NOT NULL DEFAULT '',
+    row_count INTEGER NOT NULL DEFAULT 0,
+    billing_sum REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (rollup, key1, key2)
+)
+"""
+
+UPSERT_ROLLUP = """
+INSERT INTO healthcare_rollups (rollup, key1, key2, row_count, billing_sum)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (rollup, key1, key2) DO UPDATE SET
+    row_count = row_count + excluded.row_count,
+    billing_sum = billing_sum + excluded.billing_sum
+"""
+
+
+def ensure_rollup_table(conn):
+    conn.execute(CREATE_ROLLUP_TABLE)
+
+
+def reset_rollups(conn):
+    """
+    Empties the rollup table, e.g. before the underlying table is replaced.
+    """
+    ensure_rollup_table(conn)
+    conn.execute("DELETE FROM healthcare_rollups")
+
+
+def _group_rows(df, name, columns):
+    import pandas as pd
+
+    keys = []
+    for col in columns:
+        values = df[col]
+        if pd.api.types.is_string_dtype(values.dtype):
+            values = values.str.strip()
+        keys.append(values)
+
+    if "Billing_Amount" in df.columns:
+        billing = df["Billing_Amount"].fillna(0.0)
+    else:
+        billing = pd.Series(0.0, index=df.index)
+
+    grouped = billing.groupby(keys).agg(["size", "sum"])
+    rows = []
+    for key, size, total in zip(grouped.index.tolist(), grouped["size"].tolist(), grouped["sum"].tolist()):
+        if not isinstance(key, tuple):
+            key = (key,)
+        key1 = key[0]
+        key2 = key[1] if len(key) > 1 else ""
+        rows.append((name, key1, key2, int(size), float(total)))
+    return rows
+
+
+def update_rollups(conn, df):
+    """
+    Adds the counts and billing sums of a batch of newly ingested rows to the rollups.
+    """
+    ensure_rollup_table(conn)
+    for name, columns in ROLLUPS.items():
+        if not all(col in df.columns for col in columns):
+            continue
+        conn.executemany(UPSERT_ROLLUP, _group_rows(df, name, columns))
+
+
+def rebuild_rollups(conn):
+    """
+    Recomputes every rollup from the healthcare_data table.
+    """
+    reset_rollups(conn)
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(healthcare_data)")}
+    for name, columns in ROLLUPS.items():
+        if not all(col in existing for col in columns):
+            continue
+        # Text keys are trimmed; numeric keys (day numbers) must keep their type
+        keys = [f"CASE WHEN typeof({col}) = 'text' THEN TRIM({col}) ELSE {col} END" for col in columns]
+        key2 = keys[1] if len(keys) > 1 else "''"
+        not_null = " AND ".join(f"{col} IS NOT NULL" for col in columns)
+        conn.execute(
+            f"""
+            INSERT INTO healthcare_rollups (rollup, key1, key2, row_count, billing_sum)
+            SELECT ?, {keys[0]}, {key2}, COUNT(*), TOTAL(Billing_Amount)
+            FROM healthcare_data
+            WHERE {not_null}
+            GROUP BY {", ".join(keys)}
+            """,
+            (name,),
+        )
+
+
+def read_rollup(conn, name):
+    """
+    Returns the stored (key1, key2, row_count, billing_sum) rows of a rollup,
+    or None if the rollup has not been populated.
+    """
+    try:
+        rows = conn.execute(
+            "SELECT key1, key2, row_count, billing_sum FROM healthcare_rollups WHERE rollup = ?",
+            (name,),
+        ).fetchall()
+    except sqlite3.OperationalError:
+        # The rollup table has not been created yet
+        return None
+    return rows or None
+
+
+def read_all_rollups(conn):
+    """
+    Returns every populated rollup in one query as {name: [(key1, key2, row_count, billing_sum), ...]},
+    or None if the rollups have not been populated.
+    """
+    try:
+        rows = conn.execute(
+            "SELECT rollup, key1, key2, row_count, billing_sum FROM healthcare_rollups"
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return None
+
+    rollups = {}
+    for name, key1, key2, row_count, billing_sum in rows:
+        rollups.setdefault(name, []).append((key1, key2, row_count, billing_sum))
+    return rollups or None
+
+
+def _metric_value(row_count, billing_sum, metric):
+    if metric == "sum":
+        return billing_sum
+    if metric == "avg":
+        return billing_sum / row_count if row_count else 0.0
+    return row_count
+
+
+def rollup_dict(conn, name, metric="count"):
+    """
+    Returns a rollup as a dict keyed by group (nested for two-column rollups).
+
+    :param metric: "count", or "sum"/"avg" of Billing_Amount
+    """
+    rows = read_rollup(conn, name)
+    if rows is None:
+        return None
+
+    nested = len(ROLLUPS[name]) > 1
+    result = {}
+    for key1, key2, row_count, billing_sum in rows:
+        value = _metric_value(row_count, billing_sum, metric)
+        if nested:
+            result.setdefault(key1, {})[key2] = value
+        else:
+            result[key1] = value
+    return result
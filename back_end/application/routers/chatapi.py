@@ -1,27 +1,96 @@
+import json
+from typing import Optional
+
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse, StreamingResponse
 from application.models import Chat
-from application.testfile import execute_sql_query, get_sql_query,refine_response
+from application.testfile import answer_query, next_page, stream_chat_pipeline
+from back_end.application.pagination import InvalidPageToken
+from back_end.application.indexes import advisor
+from back_end.application.pool import DB_PATH, connect, read_pool
+from back_end.application.prompt_cache import prompt_cache
 
 router = APIRouter()
 
 @router.post("/get-response")
-def get_chat(chat: Chat):
+async def get_chat(chat: Optional[Chat] = None, page_token: Optional[str] = None):
     """
     Handles incoming natural language queries and returns a structured response.
     
+    Generates the SQL with the LLM, executes it off the event loop and refines the
+    result; concurrent identical prompts share one run of this pipeline. Large results
+    are cut to one page: the response has the page's rows, total_rows and a next_page_token.
+    A page fetched with page_token has the same keys as the first one.
+
     :param chat: User query in natural language
+    :param page_token: Token from a previous response; returns the next page of that query's rows
     :return: JSON response with structured query results
     """
-    prompt = chat.prompt
+    if page_token:
+        try:
+            return await next_page(page_token)
+        except InvalidPageToken as e:
+            return JSONResponse(content={"message": str(e)}, status_code=400)
+
+    if chat is None:
+        return JSONResponse(content={"message": "A prompt or a page_token is required"}, status_code=400)
+    return await answer_query(chat.prompt)
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/get-response/stream")
+async def get_chat_stream(chat: Chat):
+    """
+    Streams the chat pipeline as server-sent events.
+
+    Emits a `sql` event with the generated query, a `result` event with the query
+    result metadata, `token` events with the refined answer as it is generated,
+    and a final `done` event with the LLM tokens the request used.
+    """
+    async def event_stream():
+        async for event, data in stream_chat_pipeline(chat.prompt):
+            yield sse_event(event, data)
 
-    # Generate SQL query using LLM
-    sql_query = get_sql_query(prompt)
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    # Execute the query and fetch results
-    query_result = execute_sql_query(sql_query)
 
-    query_result=refine_response(prompt,query_result)
+@router.get("/index-advice")
+def get_index_advice():
+    """
+    Reports the generated queries that scan healthcare_data and the indexes that would avoid it.
+    """
+    return advisor.report(read_pool.connection())
+
+
+@router.post("/index-advice/apply")
+def apply_index_advice(min_executions: int = 1):
+    """
+    Creates the recommended indexes for predicates seen at least min_executions times.
+    """
+    conn = connect(DB_PATH)
+    try:
+        created = advisor.apply(conn, min_executions)
+    finally:
+        conn.close()
+    return {"created": created}
+
+
+@router.get("/prompt-cache")
+def get_prompt_cache_stats():
+    """
+    Returns the size and hit/miss statistics of the prompt-to-SQL cache.
+    """
+    return prompt_cache.stats()
 
 
-    # Return the structured response
-    return {"query": sql_query, "response": query_result}
+@router.delete("/prompt-cache")
+def clear_prompt_cache():
+    prompt_cache.clear()
+    return prompt_cache.stats()
@@ -2,95 +2,203 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 
-from fastapi import APIRouter, Depends
-from fastapi.responses import JSONResponse
-import pandas as pd
-from back_end.application.database import fetch_data
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import JSONResponse, Response
+from back_end.application.aggregates import aggregate, count_many, data_fingerprint
+from back_end.application.bitmaps import build_filters, filter_key
+from back_end.application.columnar import columnar_snapshot
+from back_end.application.dictionary import read_dictionary
+from back_end.application.pool import read_pool
+from back_end.application.snapshot import fingerprint_etag, snapshot
+from back_end.application.timeseries import admission_range, admissions_timeseries, length_of_stay, parse_date, to_day
 from application.models import GenderCountResponse, BloodTypeCountResponse, AdmissionTypeCountResponse, TestResultCountResponse
 
 router = APIRouter()
 
+# Response key -> grouped columns of the datasets bundled by /insights
+INSIGHTS = {
+    "gender_counts": ["Gender"],
+    "blood_type_counts": ["Blood_Type"],
+    "blood_condition_counts": ["Blood_Type", "Medical_Condition"],
+    "gender_condition_counts": ["Gender", "Medical_Condition"],
+    "admission_type_counts": ["Admission_Type"],
+    "test_result_counts": ["Test_Results"],
+}
+
 """
 API Routes for Healthcare Data Insights
 
 This module provides FastAPI endpoints for querying and analyzing healthcare dataset insights.
 
 Functions:
-- get_dataframe(): Fetches the healthcare dataset from the database.
+- filter_params(): Reads the hospital, doctor, insurance_provider and from/to filters of a request.
+- parse_filters(): Validates the filter parameters and turns them into row filters.
+- count_response(): Wraps a count aggregate in the response shape of the routes below.
+- get_aggregate(): Groups the dataset by any columns and returns a count, sum or average per group.
 - get_gender_count(): Returns the count of patients by gender.
 - get_blood_type_count(): Returns the count of patients by blood type.
 - get_blood_condition_count(): Returns the count of medical conditions grouped by blood type.
 - get_gender_condition_count(): Returns the count of medical conditions grouped by gender.
 - get_admission_type_count(): Returns the count of patients by admission type.
 - get_test_result_count(): Returns the count of test results.
+- get_insights(): Returns all six count datasets above in one response, with ETag/304 support.
+- get_filter_options(): Returns the insurance providers and admission date range for filter widgets.
+- get_admissions_timeseries(): Returns admissions per day or month, optionally between two dates.
+- get_length_of_stay(): Returns the distribution and summary statistics of the length of stay in days.
+- refresh_snapshot(): Forces the dataset snapshot (or columnar export) to reload from the database.
+
+Every aggregate route accepts the filters; repeat a parameter to select several values.
 
 Dependencies:
-- fetch_data(): Fetches the dataset from the SQLite database.
+- aggregate(): Answers group-bys from the ingest rollups, or with a vectorized groupby over the snapshot.
+- bitmaps: Selects the rows matching the filters with per-value bitmap indexes.
+- snapshot: Loads the dataset once and reloads it only when the database changes.
+- timeseries: Serves the time series and length of stay from the pre-bucketed day rollups.
 - FastAPI response models: Defines structured API responses.
 """
 
 
-def get_dataframe():
-    df = fetch_data()
-    if df is None or df.empty:
-        return None
-    return df
-# print(df)
+def filter_params(
+    hospital: Optional[List[str]] = Query(None),
+    doctor: Optional[List[str]] = Query(None),
+    insurance_provider: Optional[List[str]] = Query(None),
+    start: Optional[str] = Query(None, alias="from"),
+    end: Optional[str] = Query(None, alias="to"),
+):
+    return {
+        "values": {"hospital": hospital, "doctor": doctor, "insurance_provider": insurance_provider},
+        "from": start,
+        "to": end,
+    }
+
+def parse_filters(params, dates=True):
+    start = parse_date(params["from"], "from") if dates and params["from"] else None
+    end = parse_date(params["to"], "to") if dates and params["to"] else None
+    return build_filters(
+        params["values"],
+        None if start is None else to_day(start),
+        None if end is None else to_day(end),
+    )
+
+def count_response(key, by, message, params):
+    try:
+        counts = aggregate(by, filters=parse_filters(params))
+    except ValueError as e:
+        return JSONResponse(content={"message": str(e)}, status_code=400)
+    if counts is None:
+        return JSONResponse(content={"message": message}, status_code=404)
+    return {key: counts}
+
+@router.post("/refresh")
+def refresh_snapshot():
+    if columnar_snapshot.enabled:
+        table = columnar_snapshot.refresh()
+        return {"rows": 0 if table is None else table.rows}
+    df = snapshot.refresh()
+    return {"rows": 0 if df is None else len(df)}
+
+@router.get("/aggregate")
+def get_aggregate(
+    by: str,
+    metric: str = "count",
+    layout: str = Query("nested", alias="format"),
+    params: dict = Depends(filter_params),
+):
+    columns = [col.strip() for col in by.split(",") if col.strip()]
+    try:
+        result = aggregate(columns, metric, layout, parse_filters(params))
+    except ValueError as e:
+        return JSONResponse(content={"message": str(e)}, status_code=400)
+
+    if result is None:
+        return JSONResponse(content={"message": "No data found or missing columns"}, status_code=404)
+    return {"by": columns, "metric": metric, "result": result}
 
 @router.get("/gender-count", response_model=GenderCountResponse)
-def get_gender_count(df: pd.DataFrame = Depends(get_dataframe)):
-    if df is None or "Gender" not in df.columns:
-        return JSONResponse(content={"message": "No data found or missing 'Gender' column"}, status_code=404)
-
-    gender_counts = df["Gender"].dropna().str.strip().value_counts().to_dict()
-    return {"gender_counts": gender_counts}
+def get_gender_count(params: dict = Depends(filter_params)):
+    return count_response("gender_counts", ["Gender"], "No data found or missing 'Gender' column", params)
 
 @router.get("/blood-type-count", response_model=BloodTypeCountResponse)
-def get_blood_type_count(df: pd.DataFrame = Depends(get_dataframe)):
-    if df is None or "Blood_Type" not in df.columns:
-        return JSONResponse(content={"message": "No data found or missing 'Blood_Type' column"}, status_code=404)
-
-    blood_type_counts = df["Blood_Type"].value_counts().to_dict()
-    return {"blood_type_counts": blood_type_counts}
+def get_blood_type_count(params: dict = Depends(filter_params)):
+    return count_response("blood_type_counts", ["Blood_Type"], "No data found or missing 'Blood_Type' column", params)
 
 @router.get("/blood-condition-count")
-def get_blood_condition_count(df: pd.DataFrame = Depends(get_dataframe)):
-    if df is None or not all(col in df.columns for col in ["Blood_Type", "Medical_Condition"]):
-        return JSONResponse(content={"message": "No data found or missing columns"}, status_code=404)
-    
-    blood_condition_counts = df.groupby(["Blood_Type", "Medical_Condition"]).size().reset_index(name="count")
-    blood_condition_dict = {bg: {} for bg in df["Blood_Type"].unique()}
-    
-    for _, row in blood_condition_counts.iterrows():
-        blood_condition_dict[row["Blood_Type"]][row["Medical_Condition"]] = row["count"]
-    
-    return {"blood_condition_counts": blood_condition_dict}
+def get_blood_condition_count(params: dict = Depends(filter_params)):
+    return count_response("blood_condition_counts", ["Blood_Type", "Medical_Condition"], "No data found or missing columns", params)
 
 @router.get("/gender-condition-count")
-def get_gender_condition_count(df: pd.DataFrame = Depends(get_dataframe)):
-    if df is None or not all(col in df.columns for col in ["Gender", "Medical_Condition"]):
-        return JSONResponse(content={"message": "No data found or missing columns"}, status_code=404)
-    
-    gender_condition_counts = df.groupby(["Gender", "Medical_Condition"]).size().reset_index(name="count")
-    gender_condition_dict = {g: {} for g in df["Gender"].unique()}
-    
-    for _, row in gender_condition_counts.iterrows():
-        gender_condition_dict[row["Gender"]][row["Medical_Condition"]] = row["count"]
-    
-    return {"gender_condition_counts": gender_condition_dict}
+def get_gender_condition_count(params: dict = Depends(filter_params)):
+    return count_response("gender_condition_counts", ["Gender", "Medical_Condition"], "No data found or missing columns", params)
 
 @router.get("/admission-type-count", response_model=AdmissionTypeCountResponse)
-def get_admission_type_count(df: pd.DataFrame = Depends(get_dataframe)):
-    if df is None or "Admission_Type" not in df.columns:
-        return JSONResponse(content={"message": "No data found or missing 'Admission_Type' column"}, status_code=404)
-
-    admission_counts = df["Admission_Type"].value_counts().to_dict()
-    return {"admission_type_counts": admission_counts}
+def get_admission_type_count(params: dict = Depends(filter_params)):
+    return count_response("admission_type_counts", ["Admission_Type"], "No data found or missing 'Admission_Type' column", params)
 
 @router.get("/test-result-count", response_model=TestResultCountResponse)
-def get_test_result_count(df: pd.DataFrame = Depends(get_dataframe)):
-    if df is None or "Test Results" not in df.columns:
-        return JSONResponse(content={"message": "No data found"}, status_code=404)  
+def get_test_result_count(params: dict = Depends(filter_params)):
+    return count_response("test_result_counts", ["Test_Results"], "No data found", params)
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+@router.get("/insights")
+def get_insights(request: Request, params: dict = Depends(filter_params)):
+    try:
+        filters = parse_filters(params)
+    except ValueError as e:
+        return JSONResponse(content={"message": str(e)}, status_code=400)
+
+    # The ETag only depends on the version of the data served and the filters, so it is checked before any work is done
+    etag = fingerprint_etag(data_fingerprint())
+    if filters:
+        etag = f'{etag[:-1]}-{filter_key(filters)}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    results = count_many(list(INSIGHTS.values()), filters=filters)
+    if results is None:
+        return JSONResponse(content={"message": "No data found or missing columns"}, status_code=404)
 
-    test_result_counts = df["Test Results"].value_counts().to_dict()
-    return {"test_result_counts": test_result_counts}
+    return JSONResponse(content=dict(zip(INSIGHTS, results)), headers=headers)
+
+@router.get("/filter-options")
+def get_filter_options():
+    dictionary = read_dictionary(read_pool.connection()) or {}
+    dates = admission_range()
+    return {
+        "insurance_provider": sorted(dictionary.get("Insurance_Provider", [])),
+        "admission_range": None if dates is None else {"from": dates[0].isoformat(), "to": dates[1].isoformat()},
+    }
+
+@router.get("/admissions-timeseries")
+def get_admissions_timeseries(granularity: str = "day", params: dict = Depends(filter_params)):
+    # from/to bound the series rather than filter it
+    try:
+        start = parse_date(params["from"], "from") if params["from"] else None
+        end = parse_date(params["to"], "to") if params["to"] else None
+        series = admissions_timeseries(granularity, start, end, parse_filters(params, dates=False))
+    except ValueError as e:
+        return JSONResponse(content={"message": str(e)}, status_code=400)
+
+    if series is None:
+        return JSONResponse(content={"message": "No data found or missing 'Admission_Day' column"}, status_code=404)
+    return {
+        "granularity": granularity,
+        "series": [{"period": period, "admissions": admissions} for period, admissions in series],
+    }
+
+@router.get("/length-of-stay")
+def get_length_of_stay(params: dict = Depends(filter_params)):
+    try:
+        stats = length_of_stay(parse_filters(params))
+    except ValueError as e:
+        return JSONResponse(content={"message": str(e)}, status_code=400)
+    if stats is None:
+        return JSONResponse(content={"message": "No data found or missing 'Length_of_Stay' column"}, status_code=404)
+    return stats
@@ -0,0 +1,110 @@
+import hashlib
+import os
+import threading
+
+from back_end.application.database import load_table
+from back_end.application.metrics import span
+from back_end.application.pool import DB_PATH, connect
+
+"""
+Shared in-memory snapshot of the healthcare_data table.
+
+The /health routes used to run `SELECT * FROM healthcare_data` into a fresh
+DataFrame on every request. The snapshot loads the table once and hands the
+same DataFrame to every caller until the data version changes.
+
+The data version is taken from SQLite's `PRAGMA data_version` (bumped when
+another connection commits) together with the mtime/size of the database
+file and its WAL, so a replaced file is picked up as well.
+"""
+
+
+def file_fingerprint(db_path):
+    """
+    Returns a (mtime_ns, size) tuple for the database file and its WAL.
+    """
+    parts = []
+    for path in (db_path, db_path + "-wal"):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stat = None
+        # Opening a connection creates an empty WAL, which changes no data
+        if stat is None or (path != db_path and stat.st_size == 0):
+            parts.append(None)
+        else:
+            parts.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(parts)
+
+
+def fingerprint_etag(fingerprint):
+    """
+    Returns a strong HTTP ETag for a data fingerprint, identical across worker processes.
+    """
+    return '"' + hashlib.sha1(repr(fingerprint).encode()).hexdigest()[:20] + '"'
+
+
+class DatasetSnapshot:
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._df = None
+        self._version = None
+
+    def _connection(self):
+        # data_version is tracked per connection, so keep one open for the
+        # lifetime of the snapshot.
+        if self._conn is None:
+            self._conn = connect(self.db_path, readonly=True)
+        return self._conn
+
+    def fingerprint(self):
+        return file_fingerprint(self.db_path)
+
+    def etag(self):
+        """
+        Returns a strong HTTP ETag for the current data, identical across worker processes.
+        """
+        return fingerprint_etag(self.fingerprint())
+
+    def _current_version(self):
+        data_version = self._connection().execute("PRAGMA data_version;").fetchone()[0]
+        return (data_version, self.fingerprint())
+
+    def _load(self):
+        with span("snapshot_load"):
+            df = load_table(self._connection())
+        if df.empty:
+            return None
+        return df
+
+    def get(self):
+        """
+        Returns the cached DataFrame, reloading it only if the data version changed.
+        """
+        with self._lock:
+            version = self._current_version()
+            if self._version != version:
+                self._df = self._load()
+                self._version = version
+            return self._df
+
+    def refresh(self):
+        """
+        Forces a reload of the table on the next access and returns the new frame.
+        """
+        with self._lock:
+            self._version = None
+        return self.get()
+
+    @property
+    def version(self):
+        return self._version
+
+
+snapshot = DatasetSnapshot(DB_PATH)
+
+
+def get_snapshot():
+    return snapshot.get()
@@ -0,0 +1,144 @@
+"""
+Cost guard for generated SQL.
+
+execute_sql_query() runs whatever SQL the LLM returns. Before it does,
+check_query() rejects anything that is not a single SELECT statement and
+looks at EXPLAIN QUERY PLAN for plans that cannot finish quickly on a large
+table: a cartesian join (two full scans nested in one loop) and an ORDER BY
+that sorts every row of a large table.
+
+Queries that pass are run inside time_budget(), which installs an SQLite
+progress handler that interrupts the statement once its wall-clock budget
+is spent. SQLite then abandons the statement cleanly and the pooled
+connection stays usable. Result sizes are capped at MAX_RESULT_ROWS.
+
+Rejected and aborted queries are counted in healthcare_sql_guard_total, by
+reason; healthcare_sql_queries_total only counts the queries that ran to
+success or failed with an error.
+"""
+
+import os
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from back_end.application.metrics import registry
+
+# Wall-clock budget of one generated query (the page and its row count), in seconds
+TIME_BUDGET = float(os.getenv("HEALTHCARE_SQL_TIME_BUDGET", "5"))
+
+# Rows of a result that can be paged through; larger results are truncated
+MAX_RESULT_ROWS = int(os.getenv("HEALTHCARE_SQL_MAX_ROWS", "10000"))
+
+# Tables larger than this are not sorted without an index
+MAX_SORT_ROWS = int(os.getenv("HEALTHCARE_SQL_MAX_SORT_ROWS", "1000000"))
+
+# SQLite virtual machine instructions between two checks of the deadline
+PROGRESS_STEPS = 10000
+
+# Grouped or aggregated results are small, so sorting them is cheap
+GROUPING = re.compile(r"\bGROUP\s+BY\b|\bDISTINCT\b|\b(?:COUNT|SUM|AVG|MIN|MAX|TOTAL)\s*\(", re.IGNORECASE)
+STRING_OR_COMMENT = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|--[^\n]*|/\*.*?\*/", re.DOTALL)
+# "SCAN t" and "SCAN t USING [COVERING] INDEX i" visit every row; "SEARCH t ..." uses an index lookup
+FULL_SCAN = re.compile(r"^SCAN (?!CONSTANT ROW)(?:TABLE )?(\w+)")
+
+registry.describe("healthcare_sql_guard_total", "Generated queries rejected or aborted by the SQL guard")
+
+
+class QueryRejected(ValueError):
+    """
+    Raised for SQL that is not a single SELECT or whose plan is too expensive to run.
+    """
+
+
+class QueryAborted(RuntimeError):
+    """
+    Raised when a query is interrupted for exceeding its time budget.
+    """
+
+
+def reject(reason, message):
+    registry.inc("healthcare_sql_guard_total", outcome="rejected", reason=reason)
+    raise QueryRejected(message)
+
+
+def aborted(seconds):
+    registry.inc("healthcare_sql_guard_total", outcome="aborted", reason="time_budget")
+    return QueryAborted(f"The query was stopped after exceeding its {seconds:g}s time budget")
+
+
+def check_statement(sql_query):
+    """
+    Rejects anything but a single SELECT (or WITH ... SELECT) statement.
+    """
+    code = STRING_OR_COMMENT.sub(" ", sql_query).strip().rstrip(";").strip()
+    if ";" in code:
+        reject("multiple_statements", "Only a single SQL statement can be run")
+    first_word = code.split(None, 1)[0].upper() if code else ""
+    if first_word not in ("SELECT", "WITH"):
+        reject("not_select", "Only SELECT queries can be run")
+
+
+def table_rows(conn, table):
+    """
+    Returns the row count ANALYZE recorded for a table, or None without statistics.
+    """
+    try:
+        # The first number of every stat row of a table is its row count
+        row = conn.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = ? LIMIT 1", (table,)).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return int(row[0].split()[0]) if row else None
+
+
+def check_plan(conn, sql_query, params=()):
+    """
+    Rejects queries whose EXPLAIN QUERY PLAN shows a cartesian join or a large unindexed sort.
+    """
+    plan = conn.execute(f"EXPLAIN QUERY PLAN {sql_query}", params).fetchall()
+
+    # Full scans grouped by the plan node they are nested in; two in the same
+    # loop nest mean every row of one is paired with every row of the other
+    scans_by_parent = {}
+    for _, parent, _, detail in plan:
+        match = FULL_SCAN.match(detail)
+        if match:
+            scans_by_parent.setdefault(parent, []).append(match.group(1))
+
+    if any(len(scans) > 1 for scans in scans_by_parent.values()):
+        reject("cartesian_join", "The query joins tables without a join condition an index can use")
+
+    details = [row[-1] for row in plan]
+    sorts_rows = any("TEMP B-TREE FOR ORDER BY" in detail for detail in details)
+    grouped = GROUPING.search(STRING_OR_COMMENT.sub(" ", sql_query)) is not None
+    if sorts_rows and not grouped and scans_by_parent:
+        tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        for table in tables:
+            if not re.search(rf"\b{re.escape(table)}\b", sql_query, re.IGNORECASE):
+                continue
+            rows = table_rows(conn, table)
+            if rows is not None and rows > MAX_SORT_ROWS:
+                reject("unindexed_sort", f"The query sorts all {rows:,} rows of {table} without an index")
+
+
+def check_query(conn, sql_query, params=()):
+    check_statement(sql_query)
+    check_plan(conn, sql_query, params)
+
+
+@contextmanager
+def time_budget(conn, seconds=TIME_BUDGET):
+    """
+    Interrupts the statements run on conn inside the block once `seconds` have passed.
+    """
+    deadline = time.monotonic() + seconds
+    conn.set_progress_handler(lambda: time.monotonic() > deadline, PROGRESS_STEPS)
+    try:
+        yield
+    except sqlite3.OperationalError as e:
+        if "interrupted" not in str(e):
+            raise
+        raise aborted(seconds)
+    finally:
+        conn.set_progress_handler(None, 0)
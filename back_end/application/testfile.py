@@ -1,46 +1,56 @@
+import asyncio
 import os
 import sqlite3
-from groq import Groq
+
+from back_end.application.catalog import schema_prompt
+from back_end.application.coalesce import SingleFlight
+from back_end.application.engines import get_engine
+from back_end.application.formatter import format_result
+from back_end.application.indexes import advisor
+from back_end.application.intents import match_intent
+from back_end.application.metrics import record_llm_usage, registry, request_tokens, span
+from back_end.application.pagination import PAGE_SIZE, decode_page_token, encode_page_token
+from back_end.application.prompt_cache import prompt_cache
+from back_end.application.sql_guard import MAX_RESULT_ROWS, QueryAborted, QueryRejected, reject
 
 # Load Groq API key from environment variable
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
-# Initialize Groq Client
-client = Groq(api_key=GROQ_API_KEY)
-
-# Define the database schema
-schema_definition = """
-Table: healthcare_data
-Columns:
-- ID (INTEGER PRIMARY KEY): Unique patient ID
-- Name (TEXT): Patient's name
-- Age (INTEGER): Patient's age
-- Gender (TEXT): Gender of the patient
-- Blood_Type (TEXT): Blood type of the patient
-- Medical_Condition (TEXT): Diagnosed medical condition
-- Date_of_Admission (TEXT): Date of hospital admission
-- Doctor (TEXT): Attending doctor
-- Hospital (TEXT): Hospital name
-- Insurance_Provider (TEXT): Insurance company
-- Billing_Amount (REAL): Total medical bill
-- Admission_Type (TEXT): Type of admission (Emergency/Elective)
-- Discharge_Date (TEXT): Date of discharge
-- Medication (TEXT): Prescribed medication
-- Test_Results (TEXT): Lab test results
-"""
+# Groq clients, created on first use so importing this module does no setup work
+client = None
+async_client = None
 
-# Function to generate SQL query from natural language
-def get_sql_query(natural_language_query):
-    """
-    Converts a natural language query into an SQL query using an LLM.
-    """
-    messages = [
+MODEL = "llama3-8b-8192"
+
+# Concurrent identical prompts share one in-flight chat pipeline
+chat_flight = SingleFlight()
+
+
+def get_client():
+    global client
+    if client is None:
+        from groq import Groq
+        client = Groq(api_key=GROQ_API_KEY)
+    return client
+
+
+def get_async_client():
+    global async_client
+    if async_client is None:
+        from groq import AsyncGroq
+        async_client = AsyncGroq(api_key=GROQ_API_KEY)
+    return async_client
+
+
+# The schema in the prompt is narrowed to the columns the question refers to (see catalog.py)
+def sql_query_messages(natural_language_query):
+    return [
         {
             "role": "system",
             "content": (
                 "You are an AI assistant that converts natural language queries into SQL queries for a healthcare database. "
                 "The database schema is as follows:\n"
-                f"{schema_definition}\n"
+                f"{schema_prompt(natural_language_query)}\n"
                 "Ensure the SQL query is syntactically correct and optimized. "
                 "Return **only** the SQL query without explanations, comments, or additional text."
             ),
@@ -51,55 +61,130 @@ def get_sql_query(natural_language_query):
         },
     ]
 
+class SQLGenerationError(RuntimeError):
+    """
+    Raised when the LLM fails to generate SQL for a prompt.
+    """
+
+# Function to generate SQL query from natural language
+def generate_sql_query(natural_language_query):
+    """
+    Converts a natural language query into an SQL query using an LLM,
+    raising SQLGenerationError if the LLM call fails.
+    """
     try:
-        completion = client.chat.completions.create(
-            messages=messages,
-            model="llama3-8b-8192",
-            temperature=0
-        )
+        with span("sql_generation"):
+            completion = get_client().chat.completions.create(
+                messages=sql_query_messages(natural_language_query),
+                model=MODEL,
+                temperature=0
+            )
+        record_llm_usage("sql_generation", completion)
         return completion.choices[0].message.content.strip()
 
     except Exception as e:
-        return f"Error generating SQL query: {str(e)}"
+        registry.inc("healthcare_llm_errors_total", stage="sql_generation")
+        raise SQLGenerationError(f"Error generating SQL query: {str(e)}") from e
 
-# Function to execute the SQL query
-def execute_sql_query(sql_query):
+def get_sql_query(natural_language_query):
+    """
+    Returns the SQL for a natural language query: from the prompt cache for a repeated
+    question, otherwise generated by the LLM. Nothing is cached here, see remember_sql().
+    Raises SQLGenerationError if the LLM fails.
+    """
+    cached_sql = prompt_cache.get(natural_language_query)
+    if cached_sql is not None:
+        return cached_sql
+    return generate_sql_query(natural_language_query)
+
+def remember_sql(natural_language_query, sql_query, source, query_result):
+    """
+    Caches LLM-generated SQL (source "llm") once it has run successfully, and drops
+    cached SQL (source "cache") the guard now rejects or that fails to run.
     """
-    Executes an SQL query and returns the results.
+    succeeded = query_result.get("status") == "success"
+    if source == "llm" and succeeded:
+        prompt_cache.put(natural_language_query, sql_query)
+    elif source == "cache" and not succeeded:
+        prompt_cache.evict(natural_language_query)
+
+# Function to execute the SQL query
+def execute_sql_query(sql_query, offset=0, page_size=PAGE_SIZE, params=(), total_rows=None):
     """
-    database = "veludb.db"  # Ensure this is the correct database
+    Executes an SQL query and returns one page of its results.
+
+    At most page_size rows are read; when more remain, the result carries the total
+    row count and a next_page_token for fetching the following page. The rows are
+    counted once, for the first page: later pages pass the count from their token
+    as total_rows.
 
+    The SQL guard rejects statements other than a single SELECT and expensive plans,
+    and stops queries that run past their time budget. Only the first MAX_RESULT_ROWS
+    rows of a result can be paged through.
+    """
     try:
-        conn = sqlite3.connect(database)
-        cursor = conn.cursor()
-        cursor.execute(sql_query)
-        rows = cursor.fetchall()
+        if offset >= MAX_RESULT_ROWS:
+            reject("result_limit", f"Results are limited to the first {MAX_RESULT_ROWS:,} rows")
+        page_size = min(page_size, MAX_RESULT_ROWS - offset)
+
+        with span("sql_execution"):
+            # Read-only pooled connection of the configured engine, so generated SQL cannot modify the data
+            engine = get_engine()
+            conn = engine.connection()
+            engine.check_query(conn, sql_query, params)
+
+            with engine.time_budget(conn):
+                # Read one row past the page to find out whether another page follows
+                columns, rows = engine.fetch_page(conn, sql_query, params, page_size + 1, offset)
+
+                has_more = len(rows) > page_size
+                rows = rows[:page_size]
+                if not has_more:
+                    total_rows = offset + len(rows)
+                elif total_rows is None:
+                    total_rows = engine.count_rows(conn, sql_query, params, MAX_RESULT_ROWS + 1)
+
+        # The token keeps the uncapped count, so later pages report truncation too
+        counted_rows = total_rows
+        truncated = total_rows > MAX_RESULT_ROWS
+        total_rows = min(total_rows, MAX_RESULT_ROWS)
+        has_more = has_more and offset + page_size < MAX_RESULT_ROWS
 
-        # Extract column names
-        columns = [desc[0] for desc in cursor.description] if cursor.description else []
+        registry.inc("healthcare_sql_queries_total", status="success")
+        registry.inc("healthcare_sql_rows_total", len(rows))
 
-        conn.close()
+        # Let the index advisor see which predicates the generated SQL uses
+        if not params and engine.name == "sqlite":
+            advisor.record(sql_query)
 
         if not rows:
             return {"status": "success", "data": "No matching records found."}
 
-        # If the query is a COUNT query, extract the number directly
-        if "COUNT" in sql_query.upper():
-            return {"status": "success", "data": f"There are {rows[0][0]} matching records."}
-
         # Format the data output
         formatted_data = [dict(zip(columns, row)) for row in rows]
-        return {"status": "success", "data": formatted_data}
+        result = {"status": "success", "data": formatted_data, "total_rows": total_rows}
+        if truncated:
+            result["truncated"] = True
+        if has_more:
+            result["next_page_token"] = encode_page_token(sql_query, offset + page_size, params, counted_rows)
+        return result
+
+    except (QueryRejected, QueryAborted) as e:
+        # Counted once, by reason, in healthcare_sql_guard_total
+        return {"status": "error", "message": str(e)}
 
     except Exception as e:
+        registry.inc("healthcare_sql_queries_total", status="error")
         return {"status": "error", "message": f"Query execution failed: {str(e)}"}
 
-# Function to refine the response using another LLM
-def refine_response(user_query, sql_data):
+def llm_view(query_result):
     """
-    Uses another LLM to generate a natural language response from the SQL query and its result.
+    Drops the page token from a query result before it is put in an LLM prompt.
     """
-    messages = [
+    return {key: value for key, value in query_result.items() if key != "next_page_token"}
+
+def refine_messages(user_query, sql_data):
+    return [
         {
             "role": "system",
             "content": (
@@ -114,28 +199,248 @@ def refine_response(user_query, sql_data):
         },
     ]
 
+# Function to refine the response using another LLM
+def refine_response(user_query, sql_data):
+    """
+    Uses another LLM to generate a natural language response from the SQL query and its result.
+    """
     try:
-        completion = client.chat.completions.create(
-            messages=messages,
-            model="llama3-8b-8192",
-            temperature=0
-        )
+        with span("refine"):
+            completion = get_client().chat.completions.create(
+                messages=refine_messages(user_query, sql_data),
+                model=MODEL,
+                temperature=0
+            )
+        record_llm_usage("refine", completion)
         return completion.choices[0].message.content.strip()
 
     except Exception as e:
         return f"Error refining response: {str(e)}"
 
+# Async versions of the pipeline, used by the chat API so a request waiting
+# on Groq or SQLite doesn't hold a threadpool worker
+async def agenerate_sql_query(natural_language_query):
+    """
+    Async version of generate_sql_query() using the async Groq client.
+    """
+    try:
+        with span("sql_generation"):
+            # The schema prompt reads the catalog and lexicon from SQLite, so it is built off the event loop
+            messages = await asyncio.to_thread(sql_query_messages, natural_language_query)
+            completion = await get_async_client().chat.completions.create(
+                messages=messages,
+                model=MODEL,
+                temperature=0
+            )
+        record_llm_usage("sql_generation", completion)
+        return completion.choices[0].message.content.strip()
+
+    except Exception as e:
+        registry.inc("healthcare_llm_errors_total", stage="sql_generation")
+        raise SQLGenerationError(f"Error generating SQL query: {str(e)}") from e
+
+async def aget_sql_query(natural_language_query):
+    """
+    Async version of get_sql_query().
+    """
+    cached_sql = prompt_cache.get(natural_language_query)
+    if cached_sql is not None:
+        return cached_sql
+    return await agenerate_sql_query(natural_language_query)
+
+async def aexecute_sql_query(sql_query, offset=0, params=(), total_rows=None):
+    """
+    Runs execute_sql_query() in a worker thread, off the event loop.
+    """
+    return await asyncio.to_thread(execute_sql_query, sql_query, offset, PAGE_SIZE, params, total_rows)
+
+async def aresolve_query(prompt):
+    """
+    Returns the (sql_query, params, source) for a prompt: parameterized SQL from the local
+    intent matcher when it recognizes the question ("intent"), otherwise SQL from the
+    prompt cache ("cache") or generated by the LLM ("llm"). Raises SQLGenerationError
+    if the LLM fails, so no error text is ever run as SQL.
+    """
+    try:
+        with span("intent_match"):
+            match = await asyncio.to_thread(match_intent, prompt)
+    except sqlite3.Error:
+        match = None
+    registry.inc("healthcare_intent_matches_total", result="miss" if match is None else "hit")
+    if match is not None:
+        return match.sql, match.params, "intent"
+    cached_sql = prompt_cache.get(prompt)
+    if cached_sql is not None:
+        return cached_sql, (), "cache"
+    return await agenerate_sql_query(prompt), (), "llm"
+
+async def arefine_response(user_query, sql_data):
+    """
+    Async version of refine_response() using the async Groq client.
+    """
+    try:
+        with span("refine"):
+            completion = await get_async_client().chat.completions.create(
+                messages=refine_messages(user_query, sql_data),
+                model=MODEL,
+                temperature=0
+            )
+        record_llm_usage("refine", completion)
+        return completion.choices[0].message.content.strip()
+
+    except Exception as e:
+        return f"Error refining response: {str(e)}"
+
+async def astream_refine_response(user_query, sql_data):
+    """
+    Streams the refined response from a streaming completion, one text chunk at a time.
+    """
+    try:
+        with span("refine"):
+            stream = await get_async_client().chat.completions.create(
+                messages=refine_messages(user_query, sql_data),
+                model=MODEL,
+                temperature=0,
+                stream=True
+            )
+            async for chunk in stream:
+                text = chunk.choices[0].delta.content if chunk.choices else None
+                if text:
+                    yield text
+                # Groq reports the usage of a stream in the x_groq field of its last chunk
+                x_groq = getattr(chunk, "x_groq", None)
+                if getattr(x_groq, "usage", None) is not None:
+                    record_llm_usage("refine", x_groq)
+
+    except Exception as e:
+        yield f"Error refining response: {str(e)}"
+
+def result_metadata(query_result):
+    """
+    Summarizes a query result (status, row count, columns) without the rows themselves.
+    """
+    data = query_result.get("data")
+    metadata = {"status": query_result.get("status")}
+    if isinstance(data, list):
+        metadata["rows"] = len(data)
+        metadata["columns"] = list(data[0].keys()) if data else []
+    elif data is not None:
+        metadata["message"] = data
+    if "message" in query_result:
+        metadata["message"] = query_result["message"]
+    for key in ("total_rows", "next_page_token"):
+        if key in query_result:
+            metadata[key] = query_result[key]
+    return metadata
+
+def generation_error(error):
+    """
+    The query result of a prompt the LLM could not generate SQL for.
+    """
+    return {"status": "error", "message": str(error)}
+
+async def stream_chat_pipeline(prompt):
+    """
+    Runs the chat pipeline and yields (event, data) pairs as each stage completes:
+    the generated SQL, the query result metadata, then the refined answer token by token.
+    """
+    try:
+        sql_query, params, source = await aresolve_query(prompt)
+    except SQLGenerationError as e:
+        # Nothing reaches the SQL guard; the answer reports the LLM failure
+        sql_query, query_result = None, generation_error(e)
+    else:
+        yield "sql", {"query": sql_query, "params": list(params)}
+        query_result = await aexecute_sql_query(sql_query, params=params)
+        remember_sql(prompt, sql_query, source, query_result)
+    yield "result", result_metadata(query_result)
+
+    # Scalars and small tables are rendered from templates without a second LLM call
+    formatted = format_result(query_result, sql_query)
+    registry.inc("healthcare_answers_total", renderer="llm" if formatted is None else "template")
+    if formatted is not None:
+        yield "token", {"text": formatted}
+    else:
+        async for text in astream_refine_response(prompt, llm_view(query_result)):
+            yield "token", {"text": text}
+    # Headers are sent before the LLM is called, so the token counts come with the last event
+    tokens = request_tokens()
+    yield "done", {} if tokens is None else {"prompt_tokens": tokens["prompt"], "completion_tokens": tokens["completion"]}
+
+async def run_chat_pipeline(prompt):
+    try:
+        sql_query, params, source = await aresolve_query(prompt)
+    except SQLGenerationError as e:
+        # Nothing reaches the SQL guard; the answer reports the LLM failure
+        query_result = generation_error(e)
+        return chat_response(None, (), query_result, format_result(query_result))
+
+    query_result = await aexecute_sql_query(sql_query, params=params)
+    remember_sql(prompt, sql_query, source, query_result)
+
+    # Scalars and small tables are rendered from templates without a second LLM call
+    response = format_result(query_result, sql_query)
+    registry.inc("healthcare_answers_total", renderer="llm" if response is None else "template")
+    if response is None:
+        response = await arefine_response(prompt, llm_view(query_result))
+
+    return chat_response(sql_query, params, query_result, response)
+
+def chat_response(sql_query, params, query_result, response):
+    """
+    Builds the /get-response body. The first page and the pages fetched with its
+    next_page_token have the same keys; those without a value are None.
+    """
+    data = query_result.get("data")
+    total_rows = query_result.get("total_rows")
+    if total_rows is None and query_result.get("status") == "success":
+        total_rows = 0
+    return {
+        "query": sql_query,
+        "params": list(params),
+        "response": response,
+        "rows": data if isinstance(data, list) else [],
+        "total_rows": total_rows,
+        "truncated": bool(query_result.get("truncated")),
+        "next_page_token": query_result.get("next_page_token"),
+    }
+
+async def next_page(page_token):
+    """
+    Returns the page of rows a next_page_token points at, raising InvalidPageToken for a bad token.
+    Later pages are not summarized; the response says which rows they hold.
+    """
+    sql_query, offset, params, total_rows = decode_page_token(page_token)
+    query_result = await aexecute_sql_query(sql_query, offset, params, total_rows)
+    rows = query_result.get("data")
+    if query_result.get("status") != "success":
+        response = query_result.get("message")
+    elif isinstance(rows, list):
+        response = f"Rows {offset + 1:,} to {offset + len(rows):,} of {query_result['total_rows']:,}."
+    else:
+        response = rows
+    return chat_response(sql_query, params, query_result, response)
+
+async def answer_query(prompt):
+    """
+    Runs the SQL generation -> execution -> refinement pipeline for a prompt.
+    Concurrent requests with the same prompt share a single run. The key is the exact
+    prompt: prompts that only normalize alike can still have different answers.
+    """
+    return await chat_flight.do(prompt, lambda: run_chat_pipeline(prompt))
+
 # Example Usage
 if __name__ == "__main__":
     # Example user query
     user_query = "How many male patients are there?"
 
     # Step 1: Convert natural language query to SQL
-    sql_query = get_sql_query(user_query)
+    sql_query = generate_sql_query(user_query)
     print("Generated SQL Query:\n", sql_query)
 
     # Step 2: Execute SQL query and fetch results
     query_result = execute_sql_query(sql_query)
+    remember_sql(user_query, sql_query, "llm", query_result)
     print("Query Result:\n", query_result)
 
     # Step 3: Refine the response using another LLM
@@ -0,0 +1,151 @@
+"""
+Admission time series and length-of-stay statistics.
+
+Both are served from pre-bucketed counts. Ingest maintains the
+admission_day rollup (admissions per day number) and the length_of_stay
+rollup (stays per length in days). A multi-year series therefore reads a
+few thousand rollup rows instead of scanning every admission, and monthly
+buckets are summed from the daily ones.
+
+Without rollups (a table imported before they existed), the same buckets
+are computed with one GROUP BY on the indexed integer day columns. Filtered
+series (by hospital, doctor or insurance provider) are grouped over the rows
+the bitmap indexes select.
+"""
+
+import sqlite3
+from datetime import date, timedelta
+
+from back_end.application.aggregates import aggregate
+from back_end.application.pool import read_pool
+from back_end.application.rollups import read_rollup
+
+GRANULARITIES = ("day", "month")
+
+UNIX_EPOCH = date(1970, 1, 1)
+
+
+def to_day(value):
+    return (value - UNIX_EPOCH).days
+
+
+def from_day(day):
+    return UNIX_EPOCH + timedelta(days=day)
+
+
+def parse_date(value, name):
+    """
+    Parses a YYYY-MM-DD query parameter, raising ValueError with the parameter name.
+    """
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{name}' must be a date in YYYY-MM-DD format")
+
+
+def _buckets(rollup, column, filters=None):
+    """
+    Returns {key: row_count} from a rollup, or from a GROUP BY on healthcare_data without one.
+    """
+    if filters:
+        counts = aggregate([column], filters=filters)
+        return None if counts is None else {int(key): row_count for key, row_count in counts.items()}
+
+    conn = read_pool.connection()
+    rows = read_rollup(conn, rollup)
+    if rows is not None:
+        return {key1: row_count for key1, _, row_count, _ in rows if key1 is not None}
+    try:
+        rows = conn.execute(
+            f"SELECT {column}, COUNT(*) FROM healthcare_data WHERE {column} IS NOT NULL GROUP BY {column}"
+        ).fetchall()
+    except sqlite3.OperationalError:
+        # healthcare_data has not been migrated to the day columns
+        return None
+    return dict(rows)
+
+
+def admission_range():
+    """
+    Returns the (first, last) admission dates, or None if there is no data.
+    """
+    counts = _buckets("admission_day", "Admission_Day")
+    if not counts:
+        return None
+    return from_day(min(counts)), from_day(max(counts))
+
+
+def admissions_timeseries(granularity="day", start=None, end=None, filters=None):
+    """
+    Returns [(period, admissions), ...] for every day or month from start to end (inclusive),
+    defaulting to the first and last admission. Periods without admissions count 0.
+
+    :return: the series, or None if there is no data
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unsupported granularity '{granularity}', expected one of {', '.join(GRANULARITIES)}")
+    if start is not None and end is not None and start > end:
+        raise ValueError("'from' must not be after 'to'")
+
+    counts = _buckets("admission_day", "Admission_Day", filters)
+    if counts is None or not (counts or filters):
+        return None
+    if not counts and (start is None or end is None):
+        # No admission matches the filters and there are no bounds to zero-fill
+        return []
+
+    first = to_day(start) if start is not None else min(counts)
+    last = to_day(end) if end is not None else max(counts)
+
+    if granularity == "day":
+        return [
+            (from_day(day).isoformat(), counts.get(day, 0))
+            for day in range(first, last + 1)
+        ]
+
+    months = {}
+    for day, row_count in counts.items():
+        if first <= day <= last:
+            key = from_day(day).strftime("%Y-%m")
+            months[key] = months.get(key, 0) + row_count
+
+    series = []
+    year, month = from_day(first).year, from_day(first).month
+    last_month = (from_day(last).year, from_day(last).month)
+    while (year, month) <= last_month:
+        key = f"{year:04d}-{month:02d}"
+        series.append((key, months.get(key, 0)))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return series
+
+
+def _percentile(histogram, total, pct):
+    target = total * pct / 100
+    seen = 0
+    for length, row_count in histogram:
+        seen += row_count
+        if seen >= target:
+            return length
+    return histogram[-1][0]
+
+
+def length_of_stay(filters=None):
+    """
+    Returns the distribution of stay lengths in days with summary statistics, or None if there is no data.
+    """
+    counts = _buckets("length_of_stay", "Length_of_Stay", filters)
+    if counts is None or not (counts or filters):
+        return None
+    if not counts:
+        return {"stays": 0, "average_days": None, "median_days": None, "p90_days": None, "max_days": None, "distribution": {}}
+
+    histogram = sorted(counts.items())
+    total = sum(row_count for _, row_count in histogram)
+    return {
+        "stays": total,
+        "average_days": sum(length * row_count for length, row_count in histogram) / total,
+        "median_days": _percentile(histogram, total, 50),
+        "p90_days": _percentile(histogram, total, 90),
+        "max_days": histogram[-1][0],
+        "distribution": {str(length): row_count for length, row_count in histogram},
+    }
@@ -0,0 +1,147 @@
+"""
+Local stand-in for the Groq chat completions API, for load tests.
+
+Serves POST /openai/v1/chat/completions in the format the groq SDK expects,
+both as a single JSON completion and as a server-sent event stream. Answers
+come from the canned CHAT_PROMPTS of the benchmark suite: the SQL for a
+known prompt, and a short summary for everything else. Every call waits
+for a configurable latency (plus jitter and a delay per streamed chunk),
+and a configurable share of calls fail with a 503, so the app is exercised
+under realistic LLM timing without network access or API costs.
+
+Point the application at it with GROQ_BASE_URL:
+
+    python -m back_end.benchmarks.fake_groq --port 9000 --latency-ms 400 --jitter-ms 150
+    GROQ_BASE_URL=http://127.0.0.1:9000 GROQ_API_KEY=fake uvicorn back_end.application.main:app --workers 4
+
+GET /stats reports the calls served so far.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from back_end.benchmarks.run import CHAT_PROMPTS, StubCompletions
+
+
+def completion_id():
+    return f"chatcmpl-{uuid.uuid4().hex[:24]}"
+
+
+def usage(messages, content):
+    prompt_tokens = len(json.dumps(messages)) // 4
+    completion_tokens = max(1, len(content) // 4)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def create_app(latency_ms=300.0, jitter_ms=100.0, chunk_ms=10.0, error_rate=0.0, prompts=CHAT_PROMPTS, seed=None):
+    """
+    Builds the fake API.
+
+    :param latency_ms: mean delay before the first byte of every completion
+    :param jitter_ms: the delay is drawn uniformly from latency_ms +/- jitter_ms
+    :param chunk_ms: delay between two chunks of a streamed completion
+    :param error_rate: share of calls answered with a 503 instead of a completion
+    """
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse, StreamingResponse
+
+    app = FastAPI(title="Fake Groq")
+    answers = StubCompletions(prompts)
+    rng = random.Random(seed)
+    stats = {"calls": 0, "streamed": 0, "errors": 0}
+
+    def delay():
+        return max(0.0, rng.uniform(latency_ms - jitter_ms, latency_ms + jitter_ms)) / 1000
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages", [])
+        model = body.get("model", "fake")
+        stats["calls"] += 1
+
+        await asyncio.sleep(delay())
+        if rng.random() < error_rate:
+            stats["errors"] += 1
+            return JSONResponse(
+                status_code=503,
+                content={"error": {"message": "Service unavailable (injected)", "type": "internal_server_error"}},
+            )
+
+        content = answers.answer(messages)
+        created = int(time.time())
+        if not body.get("stream"):
+            return {
+                "id": completion_id(),
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [
+                    {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+                ],
+                "usage": usage(messages, content),
+            }
+
+        stats["streamed"] += 1
+        chunk_id = completion_id()
+
+        def chunk(delta, finish_reason=None, **extra):
+            data = {
+                "id": chunk_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                **extra,
+            }
+            return f"data: {json.dumps(data)}\n\n"
+
+        async def events():
+            yield chunk({"role": "assistant", "content": ""})
+            for word in content.split(" "):
+                await asyncio.sleep(chunk_ms / 1000)
+                yield chunk({"content": word + " "})
+            # Groq reports the usage of a streamed completion in the last chunk
+            yield chunk({}, "stop", x_groq={"id": chunk_id, "usage": usage(messages, content)})
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/stats")
+    def get_stats():
+        return stats
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake Groq chat completions API for load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Mean delay of a completion")
+    parser.add_argument("--jitter-ms", type=float, default=100.0, help="Uniform +/- jitter around the latency")
+    parser.add_argument("--chunk-ms", type=float, default=10.0, help="Delay between streamed chunks")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of calls that fail with a 503")
+    parser.add_argument("--seed", type=int, help="Seed for reproducible latencies and errors")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    app = create_app(args.latency_ms, args.jitter_ms, args.chunk_ms, args.error_rate, seed=args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Load generator for the running API.
+
+Drives a live server (uvicorn, any number of workers) with an open
+workload. Requests arrive as a Poisson process at --rate requests per
+second for --duration seconds, whether or not earlier requests have
+finished, the way independent users would. Each arrival picks a request
+kind by the weights of --mix:
+
+    chat     POST /get-response with one of the benchmark prompts
+    stream   POST /get-response/stream, read to the end
+    health   GET one of the /health routes of the benchmark suite
+
+Latency is measured from the scheduled arrival, so time spent queued
+behind the --concurrency limit counts too (no coordinated omission). The
+report gives throughput, error rate and p50/p95/p99 latency per kind.
+
+--unique sets the share of chat prompts made unique with a suffix, to
+control the prompt cache hit rate. Run the app against fake_groq.py to
+keep LLM latency fixed and offline:
+
+    python -m back_end.benchmarks.fake_groq --latency-ms 400 &
+    GROQ_BASE_URL=http://127.0.0.1:9000 GROQ_API_KEY=fake uvicorn back_end.application.main:app --workers 4 &
+    python -m back_end.benchmarks.load --rate 50 --duration 60 --mix chat=1,health=3 --json load.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from back_end.benchmarks.run import CHAT_PROMPTS, HEALTH_ROUTES, summarize
+
+KINDS = ("chat", "stream", "health")
+
+
+def parse_mix(value):
+    """
+    Parses "chat=1,health=3" into {kind: weight}.
+    """
+    mix = {}
+    for part in value.split(","):
+        if not part.strip():
+            continue
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in KINDS:
+            raise argparse.ArgumentTypeError(f"Unknown request kind '{kind}', expected one of {', '.join(KINDS)}")
+        try:
+            mix[kind] = float(weight or 1)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Invalid weight '{weight}' for {kind}")
+    if not mix or sum(mix.values()) <= 0:
+        raise argparse.ArgumentTypeError("The mix needs at least one kind with a positive weight")
+    return mix
+
+
+class LoadGenerator:
+    def __init__(self, base_url, rate, duration, mix, concurrency=100, unique=0.0, timeout=30.0, seed=None):
+        self.base_url = base_url.rstrip("/")
+        self.rate = rate
+        self.duration = duration
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.concurrency = concurrency
+        self.unique = unique
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.samples = {kind: [] for kind in self.kinds}
+        self.errors = {kind: {} for kind in self.kinds}
+
+    def _prompt(self):
+        prompt = self.rng.choice(list(CHAT_PROMPTS))
+        if self.rng.random() < self.unique:
+            # The canned SQL still matches; the prompt cache does not
+            prompt = f"{prompt} (request {self.rng.getrandbits(32):08x})"
+        return prompt
+
+    async def _send(self, client, kind):
+        if kind == "health":
+            response = await client.get(self.rng.choice(HEALTH_ROUTES))
+        elif kind == "chat":
+            response = await client.post("/get-response", json={"prompt": self._prompt()})
+        else:
+            async with client.stream("POST", "/get-response/stream", json={"prompt": self._prompt()}) as response:
+                async for _ in response.aiter_bytes():
+                    pass
+        return response.status_code
+
+    async def _request(self, client, semaphore, kind, scheduled):
+        async with semaphore:
+            try:
+                status = await self._send(client, kind)
+                error = None if status < 400 else f"HTTP {status}"
+            except Exception as e:
+                error = type(e).__name__
+        if error is None:
+            self.samples[kind].append(time.perf_counter() - scheduled)
+        else:
+            self.errors[kind][error] = self.errors[kind].get(error, 0) + 1
+
+    async def run(self):
+        import httpx
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=limits) as client:
+            tasks = []
+            start = time.perf_counter()
+            scheduled = start
+            while True:
+                # Exponential gaps between arrivals make a Poisson process
+                scheduled += self.rng.expovariate(self.rate)
+                if scheduled - start >= self.duration:
+                    break
+                await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+                kind = self.rng.choices(self.kinds, self.weights)[0]
+                tasks.append(asyncio.create_task(self._request(client, semaphore, kind, scheduled)))
+            await asyncio.gather(*tasks)
+            elapsed = time.perf_counter() - start
+        return self.report(elapsed)
+
+    def report(self, elapsed):
+        results = {"seconds": elapsed, "target_rate": self.rate}
+        for kind in self.kinds + ["total"]:
+            if kind == "total":
+                samples = [sample for kind_samples in self.samples.values() for sample in kind_samples]
+                errors = sum(sum(counts.values()) for counts in self.errors.values())
+                error_kinds = {}
+            else:
+                samples = self.samples[kind]
+                errors = sum(self.errors[kind].values())
+                error_kinds = self.errors[kind]
+            requests = len(samples) + errors
+            if not requests:
+                continue
+            stats = summarize(samples) if samples else {}
+            stats.update({
+                "requests": requests,
+                "errors": errors,
+                "error_rate": errors / requests,
+                "throughput_rps": len(samples) / elapsed,
+                "error_kinds": error_kinds,
+            })
+            results[kind] = stats
+        return results
+
+
+def print_report(results):
+    print(f"duration: {results['seconds']:.1f}s at a target of {results['target_rate']:g} req/s")
+    print(f"{'kind':<8} {'requests':>9} {'req/s':>8} {'errors':>8} {'p50':>10} {'p95':>10} {'p99':>10} {'max':>10}")
+    for kind in KINDS + ("total",):
+        stats = results.get(kind)
+        if stats is None:
+            continue
+        if "p50_ms" in stats:
+            latency = f"{stats['p50_ms']:>8.1f}ms {stats['p95_ms']:>8.1f}ms {stats['p99_ms']:>8.1f}ms {stats['max_ms']:>8.1f}ms"
+        else:
+            latency = f"{'-':>10} {'-':>10} {'-':>10} {'-':>10}"
+        print(
+            f"{kind:<8} {stats['requests']:>9} {stats['throughput_rps']:>8.1f} "
+            f"{stats['error_rate']:>7.1%} {latency}"
+        )
+        for error, count in stats["error_kinds"].items():
+            print(f"{'':<8} {count:>9} x {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the running API with an open workload and report latency.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Base URL of the API")
+    parser.add_argument("--rate", type=float, default=10.0, help="Mean arrivals per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to generate arrivals for")
+    parser.add_argument("--mix", type=parse_mix, default="chat=1,health=3", help="Weights per kind: chat, stream, health")
+    parser.add_argument("--concurrency", type=int, default=100, help="Maximum requests in flight")
+    parser.add_argument("--unique", type=float, default=0.0, help="Share of chat prompts that miss the prompt cache")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, help="Seed for reproducible arrivals and request choices")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    generator = LoadGenerator(
+        args.url, args.rate, args.duration, args.mix, args.concurrency, args.unique, args.timeout, args.seed
+    )
+    results = asyncio.run(generator.run())
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
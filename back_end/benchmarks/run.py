@@ -0,0 +1,234 @@
+"""
+Benchmark suite for ingest, the /health routes and the chat pipeline.
+
+Generates a synthetic dataset at the requested scale and ingests it into a
+scratch database, timing throughput. It then times fetch_data(), every
+analytics route and the chat pipeline, and reports latency percentiles and
+the peak RSS of the process.
+
+With --engines sqlite,duckdb the routes and chat queries are timed once per
+query engine, on the same data, for a side-by-side comparison.
+
+The Groq client is replaced by StubGroq, a deterministic local stand-in,
+so chat timings measure our own code rather than the network.
+To load-test a running server instead, see load.py and fake_groq.py.
+
+Usage:
+    python -m back_end.benchmarks.run --scale 10k --repeat 30 --json bench.json
+    python -m back_end.benchmarks.run --scale 1m --engines sqlite,duckdb
+"""
+
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import types
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from back_end.benchmarks.synthetic import SCALES, parse_rows, write_csv
+
+HEALTH_ROUTES = [
+    "/gender-count",
+    "/blood-type-count",
+    "/blood-condition-count",
+    "/gender-condition-count",
+    "/admission-type-count",
+    "/test-result-count",
+    "/insights",
+    "/aggregate?by=Hospital&metric=avg:Billing_Amount",
+    "/aggregate?by=Insurance_Provider,Medical_Condition&metric=sum:Billing_Amount",
+    "/aggregate?by=Age&metric=count",
+    "/insights?insurance_provider=Aetna&insurance_provider=Cigna&from=2021-01-01&to=2022-12-31",
+    "/aggregate?by=Medical_Condition&metric=avg:Billing_Amount&insurance_provider=Medicare",
+    "/admissions-timeseries?granularity=month",
+]
+
+# Chat prompts and the SQL the stub "LLM" answers them with
+CHAT_PROMPTS = {
+    "How many male patients are there?": "SELECT COUNT(*) FROM healthcare_data WHERE Gender = 'Male'",
+    "Average billing amount for cancer patients by gender":
+        "SELECT Gender, AVG(Billing_Amount) FROM healthcare_data WHERE Medical_Condition = 'Cancer' GROUP BY Gender",
+    "Which insurance providers cover the most diabetic patients over 60?":
+        "SELECT Insurance_Provider, COUNT(*) AS patients FROM healthcare_data "
+        "WHERE Medical_Condition = 'Diabetes' AND Age > 60 GROUP BY Insurance_Provider ORDER BY patients DESC",
+    "List all diabetic patients":
+        "SELECT Name, Age, Hospital FROM healthcare_data WHERE Medical_Condition = 'Diabetes'",
+}
+
+
+class StubCompletions:
+    """
+    Deterministic stand-in for groq's AsyncGroq().chat.completions.
+    """
+
+    def __init__(self, prompts):
+        self.prompts = prompts
+        self.calls = 0
+
+    def answer(self, messages):
+        user = messages[-1]["content"]
+        for prompt, sql in self.prompts.items():
+            if prompt in user and "SQL queries" in messages[0]["content"]:
+                return sql
+        return "Here is a short summary of the requested data."
+
+    async def create(self, messages, model=None, temperature=0, stream=False, **kwargs):
+        self.calls += 1
+        content = self.answer(messages)
+        usage = types.SimpleNamespace(prompt_tokens=len(str(messages)) // 4, completion_tokens=len(content) // 4)
+        if not stream:
+            message = types.SimpleNamespace(content=content)
+            return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=usage)
+
+        async def chunks():
+            for word in content.split(" "):
+                delta = types.SimpleNamespace(content=word + " ")
+                yield types.SimpleNamespace(choices=[types.SimpleNamespace(delta=delta)], usage=None)
+        return chunks()
+
+
+class StubGroq:
+    def __init__(self, prompts=CHAT_PROMPTS):
+        self.chat = types.SimpleNamespace(completions=StubCompletions(prompts))
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    position = (len(ordered) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(samples):
+    """
+    Returns latency statistics in milliseconds for a list of durations in seconds.
+    """
+    ms = [sample * 1000 for sample in samples]
+    return {
+        "runs": len(ms),
+        "mean_ms": sum(ms) / len(ms),
+        "p50_ms": percentile(ms, 50),
+        "p95_ms": percentile(ms, 95),
+        "p99_ms": percentile(ms, 99),
+        "max_ms": max(ms),
+    }
+
+
+def bench(func, repeat, warmup=1):
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and KiB elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def expect_ok(response):
+    if response.status_code != 200:
+        raise RuntimeError(f"{response.request.url} returned {response.status_code}: {response.text[:200]}")
+    return response
+
+
+def run(rows, repeat, workdir, engines=("sqlite",)):
+    csv_path = write_csv(os.path.join(workdir, "healthcare.csv"), rows)
+    db_path = os.path.join(workdir, "healthcare.db")
+    parquet_path = os.path.join(workdir, "healthcare.parquet")
+
+    # The application reads its configuration at import time
+    os.environ["HEALTHCARE_DB_PATH"] = db_path
+    os.environ["HEALTHCARE_PROMPT_CACHE_PATH"] = ""
+    os.environ["HEALTHCARE_PARQUET_PATH"] = parquet_path
+    os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+    from back_end.application.data_file import ingest_csv
+
+    results = {"rows": rows}
+    start = time.perf_counter()
+    ingest_csv(csv_path, db_path, mode="replace", parquet_path="")
+    seconds = time.perf_counter() - start
+    results["ingest"] = {"seconds": seconds, "rows_per_second": rows / seconds}
+
+    if "duckdb" in engines:
+        from back_end.application.engines import export_parquet
+        start = time.perf_counter()
+        export_parquet(db_path, parquet_path)
+        results["parquet_export"] = {"seconds": time.perf_counter() - start}
+
+    from back_end.application.database import fetch_data
+    results["fetch_data"] = bench(fetch_data, max(3, repeat // 5))
+
+    from fastapi.testclient import TestClient
+    from back_end.application.engines import use_engine
+    from back_end.application.main import app
+    client = TestClient(app)
+
+    # chatapi imports the pipeline as application.testfile
+    testfile = sys.modules["application.testfile"]
+    testfile.async_client = StubGroq()
+
+    for engine in engines:
+        use_engine(engine)
+        prefix = f"[{engine}] " if len(engines) > 1 else ""
+
+        for route in HEALTH_ROUTES:
+            results[prefix + route] = bench(lambda: expect_ok(client.get(route)), repeat)
+
+        for prompt in CHAT_PROMPTS:
+            def ask():
+                testfile.prompt_cache.clear()
+                expect_ok(client.post("/get-response", json={"prompt": prompt}))
+            results[f"{prefix}chat: {prompt}"] = bench(ask, repeat)
+
+    results["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+
+def print_report(results):
+    print(f"rows: {results['rows']:,}")
+    print(f"ingest: {results['ingest']['seconds']:.2f}s ({results['ingest']['rows_per_second']:,.0f} rows/s)")
+    if "parquet_export" in results:
+        print(f"parquet export: {results['parquet_export']['seconds']:.2f}s")
+    print(f"{'benchmark':<72} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for name, stats in results.items():
+        if isinstance(stats, dict) and "p50_ms" in stats:
+            print(
+                f"{name[:72]:<72} {stats['mean_ms']:>8.2f}ms {stats['p50_ms']:>7.2f}ms "
+                f"{stats['p95_ms']:>7.2f}ms {stats['p99_ms']:>7.2f}ms"
+            )
+    print(f"peak RSS: {results['peak_rss_mb']:.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingest, the /health routes and the chat pipeline.")
+    parser.add_argument("--scale", type=parse_rows, default=SCALES["10k"], help="10k, 1m, 10m or a row count")
+    parser.add_argument("--repeat", type=int, default=30, help="Timed runs per benchmark")
+    parser.add_argument("--workdir", help="Directory for the generated CSV and database (default: a temp dir)")
+    parser.add_argument("--engines", default="sqlite", help="Comma-separated query engines to compare (sqlite, duckdb)")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engines = tuple(name.strip() for name in args.engines.split(",") if name.strip())
+        results = run(args.scale, args.repeat, args.workdir or tmp, engines)
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
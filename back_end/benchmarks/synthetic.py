@@ -0,0 +1,137 @@
+"""
+Synthetic healthcare dataset generator.
+
+Produces CSV files with the same headers as the source healthcare dataset
+and roughly realistic distributions: blood type frequencies, a right-skewed
+billing amount, a long tail of hospitals and doctors, and admissions spread
+over five years. Rows are generated in chunks, so the 10M-row scale needs
+no more memory than the 10k one.
+
+Usage:
+    python -m back_end.benchmarks.synthetic --scale 1m healthcare_1m.csv
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+SCALES = {
+    "10k": 10_000,
+    "1m": 1_000_000,
+    "10m": 10_000_000,
+}
+
+CHUNK_SIZE = 100_000
+
+GENDERS = (["Male", "Female"], [0.5, 0.5])
+BLOOD_TYPES = (
+    ["O+", "A+", "B+", "AB+", "O-", "A-", "B-", "AB-"],
+    [0.37, 0.36, 0.09, 0.03, 0.06, 0.06, 0.02, 0.01],
+)
+CONDITIONS = (
+    ["Hypertension", "Diabetes", "Arthritis", "Obesity", "Asthma", "Cancer"],
+    [0.22, 0.2, 0.17, 0.16, 0.14, 0.11],
+)
+ADMISSION_TYPES = (["Emergency", "Elective", "Urgent"], [0.4, 0.3, 0.3])
+INSURANCE_PROVIDERS = (
+    ["Medicare", "UnitedHealthcare", "Aetna", "Cigna", "Blue Cross"],
+    [0.22, 0.21, 0.2, 0.19, 0.18],
+)
+MEDICATIONS = (
+    ["Lipitor", "Ibuprofen", "Aspirin", "Paracetamol", "Penicillin"],
+    [0.2, 0.2, 0.2, 0.2, 0.2],
+)
+TEST_RESULTS = (["Normal", "Abnormal", "Inconclusive"], [0.4, 0.35, 0.25])
+
+FIRST_NAMES = ["James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Susan"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Lopez", "Wilson"]
+HOSPITAL_SUFFIXES = ["Medical Center", "General Hospital", "Clinic", "Health", "Memorial"]
+
+START_DATE = np.datetime64("2019-01-01")
+DAYS = 5 * 365
+
+
+def _choice(rng, options, size):
+    values, weights = options
+    return np.asarray(values, dtype=object)[rng.choice(len(values), size=size, p=weights)]
+
+
+def _long_tail(rng, population, size):
+    # Zipf-like popularity: a few large hospitals/doctors, many small ones
+    ranks = rng.zipf(1.3, size=size)
+    return (ranks - 1) % population
+
+
+def generate_chunk(rng, start, size, total_rows):
+    """
+    Returns a DataFrame of `size` synthetic rows with the source CSV's headers.
+    """
+    hospitals = max(10, total_rows // 20)
+    doctors = max(20, total_rows // 5)
+
+    first = np.asarray(FIRST_NAMES, dtype=object)[rng.integers(0, len(FIRST_NAMES), size)]
+    last = np.asarray(LAST_NAMES, dtype=object)[rng.integers(0, len(LAST_NAMES), size)]
+    ids = np.arange(start, start + size).astype(str).astype(object)
+
+    hospital_ids = _long_tail(rng, hospitals, size)
+    doctor_ids = _long_tail(rng, doctors, size)
+    suffixes = np.asarray(HOSPITAL_SUFFIXES, dtype=object)[hospital_ids % len(HOSPITAL_SUFFIXES)]
+
+    admitted = START_DATE + rng.integers(0, DAYS, size).astype("timedelta64[D]")
+    length_of_stay = rng.geometric(0.12, size).clip(1, 60).astype("timedelta64[D]")
+
+    return pd.DataFrame({
+        "Name": first + " " + last + " " + ids,
+        "Age": rng.normal(52, 19, size).clip(18, 89).round().astype(int),
+        "Gender": _choice(rng, GENDERS, size),
+        "Blood Type": _choice(rng, BLOOD_TYPES, size),
+        "Medical Condition": _choice(rng, CONDITIONS, size),
+        "Date of Admission": pd.to_datetime(admitted).strftime("%Y-%m-%d"),
+        "Doctor": "Dr. " + np.asarray(LAST_NAMES, dtype=object)[doctor_ids % len(LAST_NAMES)] + " " + doctor_ids.astype(str).astype(object),
+        "Hospital": "Hospital " + hospital_ids.astype(str).astype(object) + " " + suffixes,
+        "Insurance Provider": _choice(rng, INSURANCE_PROVIDERS, size),
+        "Billing Amount": rng.lognormal(9.9, 0.6, size).round(2),
+        "Room Number": rng.integers(100, 500, size),
+        "Admission Type": _choice(rng, ADMISSION_TYPES, size),
+        "Discharge Date": pd.to_datetime(admitted + length_of_stay).strftime("%Y-%m-%d"),
+        "Medication": _choice(rng, MEDICATIONS, size),
+        "Test Results": _choice(rng, TEST_RESULTS, size),
+    })
+
+
+def generate(rows, seed=0, chunksize=CHUNK_SIZE):
+    """
+    Yields the synthetic dataset chunk by chunk.
+    """
+    rng = np.random.default_rng(seed)
+    for start in range(0, rows, chunksize):
+        yield generate_chunk(rng, start, min(chunksize, rows - start), rows)
+
+
+def write_csv(path, rows, seed=0, chunksize=CHUNK_SIZE):
+    """
+    Writes `rows` synthetic rows to a CSV file and returns its path.
+    """
+    for i, chunk in enumerate(generate(rows, seed, chunksize)):
+        chunk.to_csv(path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+    return path
+
+
+def parse_rows(value):
+    return SCALES[value.lower()] if value.lower() in SCALES else int(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic healthcare CSV.")
+    parser.add_argument("path", help="CSV file to write")
+    parser.add_argument("--scale", type=parse_rows, default=SCALES["10k"], help="10k, 1m, 10m or a row count")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    write_csv(args.path, args.scale, args.seed)
+    print(f"Wrote {args.scale} rows to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+# The application reads its configuration at import time: point it at a scratch database
+# and keep the prompt cache in memory
+WORKDIR = tempfile.mkdtemp(prefix="healthcare-tests-")
+os.environ["HEALTHCARE_DB_PATH"] = os.path.join(WORKDIR, "healthcare.db")
+os.environ["HEALTHCARE_PARQUET_PATH"] = os.path.join(WORKDIR, "healthcare.parquet")
+os.environ["HEALTHCARE_PROMPT_CACHE_PATH"] = ""
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+TEST_ROWS = 2000
+
+
+@pytest.fixture(scope="session")
+def healthcare_db():
+    """
+    Ingests a small synthetic dataset into the scratch database and returns its path.
+    """
+    from back_end.application.data_file import ingest_csv
+    from back_end.benchmarks.synthetic import write_csv
+
+    db_path = os.environ["HEALTHCARE_DB_PATH"]
+    csv_path = write_csv(os.path.join(WORKDIR, "healthcare.csv"), TEST_ROWS)
+    ingest_csv(csv_path, db_path, mode="replace", parquet_path="")
+    return db_path
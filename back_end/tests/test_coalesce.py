@@ -0,0 +1,27 @@
+import asyncio
+
+from back_end.application import testfile
+
+
+def test_concurrent_prompts_share_a_run_only_when_identical(monkeypatch):
+    runs = []
+
+    async def run_chat_pipeline(prompt):
+        runs.append(prompt)
+        await asyncio.sleep(0.01)
+        return {"query": prompt}
+
+    monkeypatch.setattr(testfile, "run_chat_pipeline", run_chat_pipeline)
+
+    async def ask_all():
+        return await asyncio.gather(
+            testfile.answer_query("How many A+ patients"),
+            testfile.answer_query("How many A- patients"),
+            testfile.answer_query("How many A+ patients"),
+        )
+
+    results = asyncio.run(ask_all())
+    assert [result["query"] for result in results] == [
+        "How many A+ patients", "How many A- patients", "How many A+ patients",
+    ]
+    assert sorted(runs) == ["How many A+ patients", "How many A- patients"]
@@ -0,0 +1,19 @@
+from back_end.application.database import load_table
+from back_end.application.dictionary import DICTIONARY_COLUMNS
+from back_end.application.pool import connect
+
+
+def test_loaded_categorical_codes_are_the_dictionary_codes(healthcare_db):
+    conn = connect(healthcare_db, readonly=True)
+    try:
+        df = load_table(conn)
+        for column in DICTIONARY_COLUMNS:
+            codes = dict(conn.execute(
+                "SELECT value, code FROM healthcare_dictionary WHERE column_name = ?", (column,)
+            ).fetchall())
+            values = df[column]
+            assert list(values.cat.categories) == sorted(codes, key=codes.get)
+            expected = values.astype(object).map(codes)
+            assert (values.cat.codes[values.notna()] == expected[values.notna()]).all()
+    finally:
+        conn.close()
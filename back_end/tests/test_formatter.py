@@ -0,0 +1,31 @@
+from back_end.application.formatter import classify_result, format_result
+
+
+def scalar(column, value):
+    return {"status": "success", "data": [{column: value}], "total_rows": 1}
+
+
+def test_null_aggregate_is_an_empty_result():
+    result = scalar("MAX(Billing_Amount)", None)
+    assert classify_result(result) == "empty"
+    assert format_result(result, "SELECT MAX(Billing_Amount) FROM healthcare_data WHERE Hospital = 'none'") == (
+        "No matching records found."
+    )
+
+
+def test_counts_use_the_count_phrasing():
+    assert format_result(scalar("COUNT(*)", 1082)) == "There are 1,082 matching records."
+    assert format_result(scalar("count_star()", 5)) == "There are 5 matching records."
+    assert format_result(
+        scalar("n", 12), "SELECT COUNT(*) AS n FROM healthcare_data WHERE Gender = 'Male'"
+    ) == "There are 12 matching records."
+
+
+def test_aliased_sum_and_average_use_the_aggregate_phrasing():
+    assert format_result(
+        scalar("total", 7724017.13), "SELECT SUM(Billing_Amount) AS total FROM healthcare_data"
+    ) == "The total Billing Amount is 7,724,017.13."
+    assert format_result(
+        scalar("n", 52.17), "SELECT AVG(Age) AS n FROM healthcare_data"
+    ) == "The average Age is 52.17."
+    assert format_result(scalar("total", 52.17)) == "The total is 52.17."
@@ -0,0 +1,48 @@
+import pytest
+
+from back_end.application.intents import match_intent
+
+# Prompts the intent matcher must leave to the LLM
+FALLBACKS = [
+    # Negations
+    "How many patients without cancer",
+    "Average billing for patients without diabetes",
+    "How many patients are not diabetic?",
+    "How many non-diabetic patients",
+    "Patients who don't have cancer",
+    "Count patients excluding Medicare",
+    # Age bounds that cannot all hold, or are joined by "or"
+    "Patients under 18 and over 60",
+    "How many patients under 18 or over 60",
+    "Patients aged 30 or aged 40",
+    # A filter on the grouped column
+    "How many male patients by gender",
+]
+
+
+@pytest.mark.parametrize("prompt", FALLBACKS)
+def test_falls_back_to_the_llm(healthcare_db, prompt):
+    assert match_intent(prompt) is None
+
+
+@pytest.mark.parametrize("prompt, sql, params", [
+    (
+        "How many patients with cancer",
+        "SELECT COUNT(*) FROM healthcare_data WHERE Medical_Condition = ?",
+        ("Cancer",),
+    ),
+    (
+        "Average billing for diabetes patients over 60",
+        "SELECT AVG(Billing_Amount) FROM healthcare_data WHERE Age > ? AND Medical_Condition = ?",
+        (60, "Diabetes"),
+    ),
+    (
+        "How many male patients by blood type",
+        "SELECT Blood_Type, COUNT(*) FROM healthcare_data WHERE Gender = ? GROUP BY Blood_Type ORDER BY COUNT(*) DESC",
+        ("Male",),
+    ),
+])
+def test_matches(healthcare_db, prompt, sql, params):
+    match = match_intent(prompt)
+    assert match is not None
+    assert (match.sql, match.params) == (sql, params)
@@ -0,0 +1,69 @@
+import asyncio
+import threading
+import types
+
+from back_end.application import testfile
+from back_end.application.metrics import registry
+
+
+class FailingCompletions:
+    async def create(self, **kwargs):
+        raise ConnectionError("Groq is unavailable")
+
+
+class FailingGroq:
+    def __init__(self):
+        self.chat = type("Chat", (), {"completions": FailingCompletions()})()
+
+
+def guard_rejections():
+    return sum(
+        value for line in registry.render().splitlines()
+        if line.startswith("healthcare_sql_guard_total") for value in [float(line.rsplit(" ", 1)[1])]
+    )
+
+
+def test_generation_error_is_reported_without_running_the_guard(healthcare_db, monkeypatch):
+    monkeypatch.setattr(testfile, "async_client", FailingGroq())
+    before = guard_rejections()
+
+    result = asyncio.run(testfile.run_chat_pipeline("Which doctors see the most unusual cases?"))
+
+    assert result["query"] is None
+    assert "Error generating SQL query: Groq is unavailable" in result["response"]
+    assert "Only SELECT" not in result["response"]
+    assert guard_rejections() == before
+
+
+def test_streamed_generation_error_skips_the_sql_event(healthcare_db, monkeypatch):
+    monkeypatch.setattr(testfile, "async_client", FailingGroq())
+
+    async def collect():
+        return [event async for event in testfile.stream_chat_pipeline("Which doctors see the most unusual cases?")]
+
+    events = asyncio.run(collect())
+    assert [name for name, _ in events] == ["result", "token", "done"]
+    assert "Groq is unavailable" in events[0][1]["message"]
+
+
+class RecordingCompletions:
+    async def create(self, messages, **kwargs):
+        message = types.SimpleNamespace(content="SELECT COUNT(*) FROM healthcare_data")
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=None)
+
+
+def test_sql_prompt_is_built_off_the_event_loop(healthcare_db, monkeypatch):
+    threads = []
+    build_messages = testfile.sql_query_messages
+
+    def sql_query_messages(prompt):
+        threads.append(threading.current_thread())
+        return build_messages(prompt)
+
+    monkeypatch.setattr(testfile, "sql_query_messages", sql_query_messages)
+    monkeypatch.setattr(testfile, "async_client", types.SimpleNamespace(
+        chat=types.SimpleNamespace(completions=RecordingCompletions())
+    ))
+
+    assert asyncio.run(testfile.agenerate_sql_query("How many patients?")) == "SELECT COUNT(*) FROM healthcare_data"
+    assert threads and threads[0] is not threading.main_thread()
@@ -0,0 +1,24 @@
+from back_end.application.prompt_cache import PromptCache, normalize_prompt
+
+
+def test_blood_type_signs_are_kept():
+    assert normalize_prompt("How many A+ patients?") != normalize_prompt("How many A- patients?")
+    assert normalize_prompt("Count AB+ patients") != normalize_prompt("Count AB- patients")
+    assert normalize_prompt("O+ patients") == "o+ patients"
+
+
+def test_case_whitespace_and_punctuation_are_folded():
+    assert normalize_prompt("  How many   patients? ") == normalize_prompt("how many patients")
+    assert normalize_prompt("non-diabetic patients") == "non diabetic patients"
+
+
+def test_meaningful_punctuation_is_kept():
+    assert normalize_prompt("bills over 1.5 million") != normalize_prompt("bills over 15 million")
+    assert normalize_prompt("age > 60") != normalize_prompt("age 60")
+
+
+def test_opposite_blood_types_do_not_share_sql():
+    cache = PromptCache(path="", fuzzy_threshold=0)
+    cache.put("How many A+ patients", "SELECT COUNT(*) FROM healthcare_data WHERE Blood_Type = 'A+'")
+    assert cache.get("How many A- patients") is None
+    assert cache.get("how many a+ patients?") is not None
@@ -1,16 +1,35 @@
 import streamlit as st
 import requests
 import plotly.express as px
+from datetime import date
 
 # Backend API URL
 BASE_URL = "http://127.0.0.1:8000"
 
-# Function to fetch data from FastAPI
-def fetch_data(endpoint):
+# Function to fetch the hospital/doctor/insurance/date filter choices
+def fetch_filter_options():
     try:
-        response = requests.get(f"{BASE_URL}/{endpoint}")
+        response = requests.get(f"{BASE_URL}/filter-options")
         if response.status_code == 200:
             return response.json()
+    except Exception:
+        pass
+    return {"insurance_provider": [], "admission_range": None}
+
+# Function to fetch all dashboard datasets from FastAPI in one request
+def fetch_insights(filters):
+    # Revalidate the copy from the previous interaction; unchanged data comes back as a 304.
+    # The ETag covers the filters, so a copy fetched with other filters is never reused.
+    cached = st.session_state.get("insights")
+    headers = {"If-None-Match": cached["etag"]} if cached and cached.get("etag") else {}
+    try:
+        response = requests.get(f"{BASE_URL}/insights", params=filters, headers=headers)
+        if response.status_code == 304 and cached:
+            return cached["data"]
+        if response.status_code == 200:
+            data = response.json()
+            st.session_state["insights"] = {"etag": response.headers.get("ETag"), "data": data}
+            return data
         else:
             st.error(f"Error: {response.json().get('message', 'Failed to fetch data')}")
             return None
@@ -35,13 +54,43 @@ option = st.sidebar.radio(
     ],
 )
 
+# Filters applied to every chart
+st.sidebar.title("Filters 🔎")
+filter_options = fetch_filter_options()
+filters = {}
+
+hospital = st.sidebar.text_input("Hospital")
+if hospital.strip():
+    filters["hospital"] = hospital.strip()
+
+doctor = st.sidebar.text_input("Doctor")
+if doctor.strip():
+    filters["doctor"] = doctor.strip()
+
+insurance_providers = st.sidebar.multiselect("Insurance Provider", filter_options["insurance_provider"])
+if insurance_providers:
+    filters["insurance_provider"] = insurance_providers
+
+admission_range = filter_options["admission_range"]
+if admission_range:
+    first = date.fromisoformat(admission_range["from"])
+    last = date.fromisoformat(admission_range["to"])
+    dates = st.sidebar.date_input("Admission Date", value=(first, last), min_value=first, max_value=last)
+    # The range is only complete once both ends are picked
+    if isinstance(dates, (list, tuple)) and len(dates) == 2 and tuple(dates) != (first, last):
+        filters["from"] = dates[0].isoformat()
+        filters["to"] = dates[1].isoformat()
+
 # Full-page display for selected visualization
 st.title("Healthcare Data Insights 📊")
 
+# All six datasets arrive in one response
+insights = fetch_insights(filters)
+
 # Gender Count Visualization
 if option == "Gender Distribution":
     st.subheader("Gender Distribution")
-    gender_data = fetch_data("gender-count")
+    gender_data = insights
 
     if gender_data:
         gender_counts = gender_data["gender_counts"]
@@ -57,7 +106,7 @@ if option == "Gender Distribution":
 # Blood Type Count Visualization
 elif option == "Blood Type Distribution":
     st.subheader("Blood Type Distribution")
-    blood_data = fetch_data("blood-type-count")
+    blood_data = insights
 
     if blood_data:
         blood_counts = blood_data["blood_type_counts"]
@@ -73,7 +122,7 @@ elif option == "Blood Type Distribution":
 # Blood Condition Count
 elif option == "Blood Type vs Medical Condition":
     st.subheader("Blood Type vs Medical Condition")
-    blood_condition_data = fetch_data("blood-condition-count")
+    blood_condition_data = insights
 
     if blood_condition_data:
         blood_condition_counts = blood_condition_data["blood_condition_counts"]
@@ -95,7 +144,7 @@ elif option == "Blood Type vs Medical Condition":
 # Gender Condition Count
 elif option == "Gender vs Medical Condition":
     st.subheader("Gender vs Medical Condition")
-    gender_condition_data = fetch_data("gender-condition-count")
+    gender_condition_data = insights
 
     if gender_condition_data:
         gender_condition_counts = gender_condition_data["gender_condition_counts"]
@@ -118,7 +167,7 @@ elif option == "Gender vs Medical Condition":
 # Admission Type Count
 elif option == "Admission Type Count":
     st.subheader("Admission Type Count")
-    admission_data = fetch_data("admission-type-count")
+    admission_data = insights
 
     if admission_data:
         admission_counts = admission_data["admission_type_counts"]
@@ -134,7 +183,7 @@ elif option == "Admission Type Count":
 # Test Result Count
 elif option == "Test Result Distribution":
     st.subheader("Test Result Distribution")
-    test_result_data = fetch_data("test-result-count")
+    test_result_data = insights
 
     if test_result_data:
         test_counts = test_result_data["test_result_counts"]
@@ -1,8 +1,45 @@
+import json
+
 import streamlit as st
 import requests
 
 # FastAPI backend URL
 FASTAPI_URL = "http://127.0.0.1:8000/get-response"
+FASTAPI_STREAM_URL = "http://127.0.0.1:8000/get-response/stream"
+
+# (connect, read) timeouts; the read timeout applies between streamed events
+STREAM_TIMEOUT = (5, 60)
+
+
+def stream_events(response):
+    """
+    Parses a server-sent event stream into (event, data) pairs.
+    """
+    event, data = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if line == "":
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+
+
+def rows_to_markdown(rows):
+    """
+    Renders a page of result rows as a markdown table.
+    """
+    if not rows:
+        return "No more rows."
+    columns = list(rows[0].keys())
+    lines = ["| " + " | ".join(columns) + " |", "|" + "---|" * len(columns)]
+    for row in rows:
+        lines.append("| " + " | ".join(str(row.get(col, "")) for col in columns) + " |")
+    return "\n".join(lines)
 
 # Streamlit UI setup
 st.set_page_config(page_title="Healthcare Chatbot", page_icon="🤖", layout="wide")
@@ -15,6 +52,18 @@ st.sidebar.header("🗄️ SQL Query")
 # Initialize chat history if not already present
 if "messages" not in st.session_state:
     st.session_state.messages = []
+if "next_page_token" not in st.session_state:
+    st.session_state.next_page_token = None
+
+# Large results come back one page at a time; fetch the next page on demand
+if st.session_state.next_page_token and st.sidebar.button("Load more rows"):
+    try:
+        response = requests.post(FASTAPI_URL, params={"page_token": st.session_state.next_page_token}, timeout=10)
+        page = response.json() if response.status_code == 200 else {}
+        st.session_state.next_page_token = page.get("next_page_token")
+        st.session_state.messages.append({"role": "assistant", "content": rows_to_markdown(page.get("rows") or [])})
+    except (requests.exceptions.RequestException, ValueError) as e:
+        st.sidebar.error(f"Could not load more rows: {str(e)}")
 
 # Display chat history
 for message in st.session_state.messages:
@@ -30,41 +79,41 @@ if user_input:
     with st.chat_message("user"):
         st.markdown(user_input)
 
-    # Send request to FastAPI
+    # Stream the response from FastAPI: the SQL query arrives first, then the answer token by token
     payload = {"prompt": user_input}
-    try:
-        response = requests.post(FASTAPI_URL, json=payload, timeout=10)
-        if response.status_code == 200:
-            response_data = response.json()
-
-            # Extract SQL Query
-            sql_query = response_data.get("query", "No SQL query generated.")
-
-            # Fix: Handle both string and dictionary responses
-            response_value = response_data.get("response", "No data available.")
-            if isinstance(response_value, dict):
-                result = response_value.get("data", "No data available.")
-            else:
-                result = response_value  # Use string directly
-
-        else:
-            sql_query = "N/A"
-            result = "Error: Unable to retrieve data."
-
-    except requests.exceptions.RequestException as e:
-        sql_query = "N/A"
-        result = f"Connection error: {str(e)}"
-    except ValueError:
-        sql_query = "N/A"
-        result = "Error: Invalid JSON received."
-
-    # Display SQL Query in Sidebar
-    with st.sidebar:
-        st.code(sql_query, language="sql")
-
-    # Display Chatbot Response
+    sql_query = "N/A"
+    result = ""
     with st.chat_message("assistant"):
-        st.markdown(f"### 📊 Result\n{result}")
+        placeholder = st.empty()
+        placeholder.markdown("### 📊 Result\n_Thinking..._")
+        try:
+            with requests.post(FASTAPI_STREAM_URL, json=payload, stream=True, timeout=STREAM_TIMEOUT) as response:
+                if response.status_code == 200:
+                    for event, data in stream_events(response):
+                        if event == "sql":
+                            # Display SQL Query in Sidebar as soon as it is generated
+                            sql_query = data.get("query", "No SQL query generated.")
+                            with st.sidebar:
+                                st.code(sql_query, language="sql")
+                        elif event == "result":
+                            if data.get("status") == "error":
+                                st.caption(data.get("message", "Query execution failed."))
+                            st.session_state.next_page_token = data.get("next_page_token")
+                            if data.get("next_page_token"):
+                                st.caption(f"Summarizing the first {data.get('rows')} of {data.get('total_rows')} rows.")
+                        elif event == "token":
+                            result += data.get("text", "")
+                            placeholder.markdown(f"### 📊 Result\n{result}▌")
+                else:
+                    result = "Error: Unable to retrieve data."
+
+        except requests.exceptions.RequestException as e:
+            result = f"Connection error: {str(e)}"
+        except ValueError:
+            result = "Error: Invalid JSON received."
+
+        # Display Chatbot Response
+        placeholder.markdown(f"### 📊 Result\n{result or 'No data available.'}")
 
     # Save response to chat history
     st.session_state.messages.append({